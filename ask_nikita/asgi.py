@@ -0,0 +1,31 @@
+"""
+ASGI config for ask_nikita project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are routed through ``ask_nikita.asgi_urls``, which serves the read
+pages from ``questions.async_views``.
+
+    uvicorn ask_nikita.asgi:application --workers 4
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+import django
+from django.core.handlers.asgi import ASGIHandler
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ask_nikita.settings")
+
+
+class AsyncViewsHandler(ASGIHandler):
+    urlconf = "ask_nikita.asgi_urls"
+
+    async def get_response_async(self, request):
+        request.urlconf = self.urlconf
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = AsyncViewsHandler()
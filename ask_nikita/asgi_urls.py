@@ -0,0 +1,15 @@
+"""
+URL configuration used by ``ask_nikita.asgi``: the async read views take
+precedence over their sync counterparts, everything else comes from
+``ask_nikita.urls``.
+"""
+from django.urls import include, path
+from questions import async_views
+
+urlpatterns = [
+    path("", async_views.index, name="index"),
+    path("question/<int:id>/", async_views.question, name="question"),
+    path("tag/<tagname>/", async_views.tag, name="tag"),
+    path("hot/", async_views.hot, name="hot"),
+    path("", include("ask_nikita.urls")),
+]
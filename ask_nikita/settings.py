@@ -11,6 +11,10 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import tempfile
+
+import django
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -38,12 +42,15 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "questions",
+    "questions.apps.QuestionsConfig",
     "widget_tweaks",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "questions.middleware.StaticFilesMiddleware",
+    "questions.middleware.PerformanceMiddleware",
+    "questions.middleware.ReplicaStickinessMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -76,13 +83,174 @@ WSGI_APPLICATION = "ask_nikita.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
-DATABASES = {
+# DATABASE_PROFILE=sqlite (default) or postgres. Setting DATABASE_REPLICA
+# (a replica host for postgres, a second file for sqlite) adds a "replica"
+# alias that serves GET requests; see questions.routers.
+
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "sqlite")
+
+if DATABASE_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DATABASE_NAME", "ask_nikita"),
+            "USER": os.environ.get("DATABASE_USER", "ask_nikita"),
+            "PASSWORD": os.environ.get("DATABASE_PASSWORD", ""),
+            "HOST": os.environ.get("DATABASE_HOST", "localhost"),
+            "PORT": os.environ.get("DATABASE_PORT", "5432"),
+            # Persistent connections
+            "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", "60")),
+            "OPTIONS": {},
+        }
+    }
+    if django.VERSION >= (4, 1):
+        # checked before reuse, so a dropped connection is not handed out
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    if os.environ.get("DATABASE_POOL"):
+        # psycopg 3 connection pool; replaces CONN_MAX_AGE
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured(
+                "DATABASE_POOL needs Django 5.1 and psycopg 3, this is Django %s"
+                % django.get_version()
+            )
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DATABASE_POOL_MIN", "2")),
+            "max_size": int(os.environ.get("DATABASE_POOL_MAX", "20")),
+        }
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+    if os.environ.get("DATABASE_REPLICA"):
+        DATABASES["replica"] = dict(
+            DATABASES["default"],
+            HOST=os.environ["DATABASE_REPLICA"],
+            OPTIONS=dict(DATABASES["default"]["OPTIONS"]),
+            TEST={"MIRROR": "default"},
+        )
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get(
+                "DATABASE_NAME", os.path.join(BASE_DIR, "db.sqlite3")
+            ),
+            # A file rather than the shared-cache in-memory database, whose
+            # table locks fail at once instead of waiting like file locks do,
+            # so threaded tests see the locking production does.
+            "TEST": {
+                "NAME": os.path.join(tempfile.gettempdir(), "ask_nikita_test.sqlite3")
+            },
+        }
+    }
+    if os.environ.get("DATABASE_REPLICA"):
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ["DATABASE_REPLICA"],
+            "TEST": {"MIRROR": "default"},
+        }
+
+# Opt-in SQLite profile for single-node deployments: WAL journal,
+# busy_timeout, synchronous=NORMAL, mmap and a larger page cache are set on
+# every new connection. SQLITE_PRAGMAS overrides individual pragmas.
+SQLITE_TUNED = os.environ.get("SQLITE_TUNED") == "1"
+SQLITE_PRAGMAS = {}
+
+if "replica" in DATABASES:
+    DATABASE_ROUTERS = ["questions.routers.PrimaryReplicaRouter"]
+
+# Seconds a client keeps reading from the primary after a write request
+REPLICA_STICKY_SECONDS = 10
+
+
+# Per-view timings, Server-Timing headers and the /metrics/ export
+PERFORMANCE_METRICS = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# CACHE_URL picks the backend: locmem:// (the default, private to each
+# process), memcached://host:port (needs pymemcache) or redis://host:port/db
+# (needs django-redis). The sidebar refreshed by cron, its single-flight
+# lock, page cache versions, rate-limit buckets and the leaderboard are only
+# shared between workers and with management commands by memcached or redis.
+CACHE_URL = os.environ.get("CACHE_URL", "locmem://")
+_cache_scheme, _, _cache_location = CACHE_URL.partition("://")
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "BACKEND": {
+            "locmem": "django.core.cache.backends.locmem.LocMemCache",
+            "dummy": "django.core.cache.backends.dummy.DummyCache",
+            "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "redis": "django_redis.cache.RedisCache",
+        }[_cache_scheme],
+        "LOCATION": CACHE_URL if _cache_scheme == "redis" else _cache_location,
     }
 }
+SHARED_CACHE = _cache_scheme in ("memcached", "redis")
+
+# "db" is Django's default, "cache" keeps sessions in the cache and writes
+# them through to the database, "cookies" stores them in signed cookies.
+# "cache" needs a shared CACHE_URL, or a logout in one worker leaves the
+# session alive in the others.
+SESSION_ENGINE = {
+    "db": "django.contrib.sessions.backends.db",
+    "cache": "django.contrib.sessions.backends.cached_db",
+    "cookies": "django.contrib.sessions.backends.signed_cookies",
+}[os.environ.get("SESSION_BACKEND", "db")]
+
+# With a shared cache the logged-in user is read from the cache rather than
+# the users table; with a per-process cache it is always loaded from the
+# database, so a password change takes effect in every worker.
+AUTHENTICATION_BACKENDS = ["questions.auth.CachedModelBackend"]
+USER_CACHE_TIMEOUT = 300
+
+# Seconds the "Popular Tags"/"Best Members" sidebar is served before refresh
+SIDEBAR_CACHE_TIMEOUT = 300
+SIDEBAR_SIZE = 10
+# Seconds the incrementally updated "Best Members" board lives between reloads
+LEADERBOARD_TIMEOUT = 3600
+
+# "Trending this week" window, and how long tag activity buckets are kept:
+# hourly ones are folded into daily ones by compact_tag_activity, daily ones
+# are dropped (all-time counts live on Tag.questions_count).
+TRENDING_WINDOW_DAYS = 7
+TRENDING_HOURLY_RETENTION_HOURS = 48
+TRENDING_DAILY_RETENTION_DAYS = 90
+
+# Seconds anonymous renders of index/hot/tag/question pages are reused;
+# new questions, answers and votes invalidate them earlier
+PAGE_CACHE_TIMEOUT = 60
+
+# Full-text search index over question titles, question texts and answers
+SEARCH_BACKEND = {
+    "postgres": "questions.search.PostgresFtsBackend",
+}.get(DATABASE_PROFILE, "questions.search.SqliteFtsBackend")
+
+
+# "scrypt" (memory-hard, standard library), "argon2" (needs argon2-cffi) or
+# "pbkdf2". The others stay listed so existing hashes still verify; they are
+# re-encoded with the preferred hasher on the next successful login.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+_PASSWORD_HASHERS = {
+    "scrypt": "questions.hashers.ScryptPasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS.pop(PASSWORD_HASHER)] + [
+    *_PASSWORD_HASHERS.values(),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+SCRYPT_WORK_FACTOR = int(os.environ.get("SCRYPT_WORK_FACTOR", 2 ** 14))
 
+# Token buckets in front of sign-in/sign-up, checked before any password is
+# hashed: kind -> (burst, tokens refilled per minute).
+RATE_LIMITS = {
+    "ip": (20, 10),
+    "login": (5, 2),
+}
+# Reverse proxies in front of the app that append to X-Forwarded-For; the
+# "ip" bucket keys on the address the outermost of them saw. 0 uses
+# REMOTE_ADDR, which behind a proxy puts every client in one bucket.
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 0))
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -124,6 +292,16 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
+STATIC_ROOT = os.environ.get("STATIC_ROOT", os.path.join(BASE_DIR, "staticfiles"))
+# collectstatic writes content-hashed, precompressed copies to STATIC_ROOT,
+# which StaticFilesMiddleware serves with far-future caching headers.
+STATICFILES_STORAGE = "questions.staticfiles.CompressedManifestStaticFilesStorage"
+SERVE_STATIC = not DEBUG
+STATIC_MAX_AGE = 60
 AUTH_USER_MODEL = "questions.User"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Avatar thumbnails are built off the request thread by this many workers.
+AVATAR_WORKERS = int(os.environ.get("AVATAR_WORKERS", 2))
+AVATAR_SIZES = (64, 128)
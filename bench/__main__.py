@@ -0,0 +1,277 @@
+"""
+Offline HTTP benchmark of the hot views.
+
+    python -m bench --size small --output bench-small.json
+    python -m bench --size small --compare bench-small.json
+
+Seeds a deterministic SQLite dataset per size (reused between runs), drives
+``ask_nikita.wsgi.application`` in-process and writes latency percentiles,
+queries per request and requests/sec per scenario as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SIZES = {
+    "tiny": dict(users=20, tags=10, questions=200, answers=600, votes=1000),
+    "small": dict(users=200, tags=50, questions=5000, answers=15000, votes=20000),
+    "medium": dict(users=2000, tags=200, questions=50000, answers=150000, votes=200000),
+    "large": dict(
+        users=20000, tags=1000, questions=500000, answers=1500000, votes=2000000
+    ),
+    # Every question carries all three tags, so each tag lists 100k questions;
+    # compare the tag_* scenarios against a smaller size to see they stay flat.
+    "tags100k": dict(users=200, tags=3, questions=100000, answers=1000, votes=1000),
+}
+SEED = 20201
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Print deltas against an earlier JSON file")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Run with the dummy cache backend"
+    )
+    parser.add_argument(
+        "--fresh", action="store_true", help="Regenerate the dataset even if present"
+    )
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios")
+    return parser.parse_args(argv)
+
+
+def setup(args):
+    os.environ["DJANGO_SETTINGS_MODULE"] = "bench.settings"
+    os.environ["BENCH_CACHE"] = "0" if args.no_cache else "1"
+    seed_db = os.path.join(
+        tempfile.gettempdir(), "ask_nikita_bench_%s.seed.sqlite3" % args.size
+    )
+    if args.fresh and os.path.exists(seed_db):
+        os.remove(seed_db)
+    seeded = os.path.exists(seed_db)
+    os.environ["BENCH_DB"] = seed_db
+
+    import django
+    from django.core.management import call_command
+    from django.db import connections
+
+    django.setup()
+    if not seeded:
+        call_command("migrate", run_syncdb=True, verbosity=0)
+        call_command("fill_db", seed=SEED, stdout=sys.stderr, **SIZES[args.size])
+    connections.close_all()
+    call_command("collectstatic", interactive=False, clear=True, verbosity=0)
+
+    # Write scenarios run against a throwaway copy so every run starts from
+    # the same dataset.
+    db = seed_db.replace(".seed.", ".run.")
+    shutil.copyfile(seed_db, db)
+    connections["default"].settings_dict["NAME"] = db
+
+
+def scenarios():
+    from django.templatetags.static import static
+    from questions.models import Question, Tag, User
+
+    question_ids = list(
+        Question.objects.order_by("-answers_count", "id").values_list("id", flat=True)[
+            :20
+        ]
+    )
+    tags = list(Tag.objects.order_by("id").values_list("title", flat=True)[:20])
+    largest = Tag.objects.order_by("-questions_count", "id").first().title
+    username = User.objects.order_by("id").values_list("username", flat=True).first()
+
+    def cycle(items):
+        return lambda i: items[i % len(items)]
+
+    question = cycle(question_ids)
+    tag = cycle(tags)
+    asset = cycle(
+        [
+            static(name)
+            for name in (
+                "css/bootstrap.min.css",
+                "css/style.css",
+                "js/jquery.min.js",
+                "js/bootstrap.min.js",
+            )
+        ]
+    )
+
+    def login(client, i):
+        client.cookies.clear()
+        token = client.csrf_token("/login/")
+        return client.post(
+            "/login/",
+            {"login": username, "password": "12345", "csrfmiddlewaretoken": token},
+        )
+
+    def member_get(path):
+        # Logged-in requests skip the anonymous page cache, so these measure
+        # the listing itself.
+        def scenario(client, i):
+            if "sessionid" not in client.cookies:
+                login(client, i)
+            return client.get(path)
+
+        return scenario
+
+    def answer(client, i):
+        if "sessionid" not in client.cookies:
+            login(client, i)
+        url = "/question/%i/" % question(i)
+        token = client.csrf_token(url)
+        return client.post(
+            url, {"text": "Benchmark answer %i" % i, "csrfmiddlewaretoken": token}
+        )
+
+    return {
+        "index": lambda client, i: client.get("/"),
+        "hot": lambda client, i: client.get("/hot/"),
+        "tag": lambda client, i: client.get("/tag/%s/" % tag(i)),
+        "tag_largest": member_get("/tag/%s/" % largest),
+        "tag_last": member_get("/tag/%s/?last" % largest),
+        "question": lambda client, i: client.get(
+            "/question/%i/?page=%i" % (question(i), 1 + i % 3)
+        ),
+        "static": lambda client, i: client.get(
+            asset(i), {"HTTP_ACCEPT_ENCODING": "gzip, deflate, br"}
+        ),
+        "login": login,
+        "answer": answer,
+    }
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run(args):
+    from ask_nikita.wsgi import application
+    from bench.client import WSGIClient
+    from django.core.cache import cache
+
+    results = {}
+    for name, scenario in scenarios().items():
+        if args.scenario and name not in args.scenario:
+            continue
+        cache.clear()
+        client = WSGIClient(application)
+        for i in range(args.warmup):
+            scenario(client, i)
+
+        latencies, queries, sizes, statuses = [], [], [], {}
+        started = time.perf_counter()
+        for i in range(args.requests):
+            response = scenario(client, args.warmup + i)
+            latencies.append(response.elapsed * 1000)
+            queries.append(response.queries)
+            sizes.append(len(response.body))
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        results[name] = {
+            "requests": args.requests,
+            "rps": args.requests / elapsed,
+            "mean_ms": statistics.mean(latencies),
+            "p50_ms": percentile(latencies, 0.5),
+            "p90_ms": percentile(latencies, 0.9),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": max(latencies),
+            "queries_mean": statistics.mean(queries),
+            "queries_max": max(queries),
+            "bytes_mean": statistics.mean(sizes),
+            "statuses": statuses,
+        }
+        print(
+            "%-9s %8.1f req/s  p50 %7.2f ms  p99 %7.2f ms  %5.1f queries"
+            % (
+                name,
+                results[name]["rps"],
+                results[name]["p50_ms"],
+                results[name]["p99_ms"],
+                results[name]["queries_mean"],
+            ),
+            file=sys.stderr,
+        )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, path):
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    print("%-9s %18s %18s %14s" % ("scenario", "p50 ms", "req/s", "queries"))
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        print(
+            "%-9s %7.2f -> %7.2f %7.1f -> %7.1f %5.1f -> %5.1f"
+            % (
+                name,
+                before["p50_ms"],
+                now["p50_ms"],
+                before["rps"],
+                now["rps"],
+                before["queries_mean"],
+                now["queries_mean"],
+            )
+        )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup(args)
+
+    import django
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "size": args.size,
+            "dataset": SIZES[args.size],
+            "cache": not args.no_cache,
+            "requests": args.requests,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "results": run(args),
+    }
+
+    if args.compare:
+        compare(report["results"], args.compare)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
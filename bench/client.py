@@ -0,0 +1,136 @@
+import re
+import time
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+from django.db import connections
+
+CSRF_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Response:
+    def __init__(self, status, headers, body, elapsed, queries):
+        self.status = int(status.split()[0])
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+        self.queries = queries
+
+
+class WSGIClient:
+    """Drives a WSGI callable in-process, keeping cookies between calls."""
+
+    def __init__(self, application):
+        self.application = application
+        self.cookies = SimpleCookie()
+
+    def request(self, method, url, data=None, headers=None):
+        parts = urlsplit(url)
+        body = urlencode(data or {}).encode()
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": "bench",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": "bench",
+            "REMOTE_ADDR": "127.0.0.1",
+            "CONTENT_TYPE": "application/x-www-form-urlencoded",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+            "wsgi.errors": BytesIO(),
+            "wsgi.url_scheme": "http",
+            "wsgi.version": (1, 0),
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        environ.update(headers or {})
+        if self.cookies:
+            environ["HTTP_COOKIE"] = "; ".join(
+                "%s=%s" % (key, morsel.value) for key, morsel in self.cookies.items()
+            )
+
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connections["default"].execute_wrapper(counter):
+            result = self.application(environ, start_response)
+            try:
+                content = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        elapsed = time.perf_counter() - started
+
+        for name, value in captured["headers"]:
+            if name.lower() == "set-cookie":
+                self.cookies.load(value)
+        return Response(
+            captured["status"], captured["headers"], content, elapsed, counter.count
+        )
+
+    def get(self, url, headers=None):
+        return self.request("GET", url, headers=headers)
+
+    def post(self, url, data):
+        return self.request("POST", url, data)
+
+    def csrf_token(self, url):
+        match = CSRF_RE.search(self.get(url).body)
+        return match.group(1).decode() if match else ""
+
+
+class ASGIClient:
+    """Drives an ASGI callable in-process, one coroutine per request."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def get(self, url, headers=None):
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")]
+            + [(k.encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await self.application(scope, receive, send)
+        elapsed = time.perf_counter() - started
+
+        start, body = messages[0], b"".join(m.get("body", b"") for m in messages[1:])
+        headers = [(k.decode(), v.decode()) for k, v in start["headers"]]
+        return Response(str(start["status"]), headers, body, elapsed, None)
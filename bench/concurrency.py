@@ -0,0 +1,158 @@
+"""
+Throughput of the read pages at high concurrency, WSGI against ASGI.
+
+    python -m bench.concurrency --size small --concurrency 64 --threads 8
+
+Both entry points run in-process with the same number of worker threads
+(the WSGI server's threads, the event loop's executor for ASGI) while
+``--concurrency`` clients keep requests in flight. The page cache is off,
+and ``--db-latency`` adds a sleep per query to emulate a database across
+the network, where a blocked thread matters most.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.concurrency")
+    parser.add_argument("--size", default="small")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument(
+        "--db-latency", type=float, default=2, help="Milliseconds added per query"
+    )
+    parser.add_argument("--fresh", action="store_true")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def add_latency(seconds):
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def slow(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if slow not in connection.execute_wrappers:
+            connection.execute_wrappers.append(slow)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(None, connection)
+
+
+def urls():
+    from questions.models import Question, Tag
+
+    question_ids = list(
+        Question.objects.order_by("-answers_count", "id").values_list("id", flat=True)[
+            :20
+        ]
+    )
+    tags = list(Tag.objects.order_by("id").values_list("title", flat=True)[:20])
+    return ["/", "/hot/"] + ["/tag/%s/" % t for t in tags[:4]] + [
+        "/question/%i/" % pk for pk in question_ids[:4]
+    ]
+
+
+def summarize(name, latencies, statuses, elapsed):
+    ordered = sorted(latencies)
+    result = {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p99_ms": ordered[int(len(ordered) * 0.99)],
+        "statuses": statuses,
+    }
+    print(
+        "%-5s %8.1f req/s  p50 %8.2f ms  p99 %8.2f ms  %s"
+        % (name, result["rps"], result["p50_ms"], result["p99_ms"], statuses),
+        file=sys.stderr,
+    )
+    return result
+
+
+def run_wsgi(args, paths):
+    from ask_nikita.wsgi import application
+    from bench.client import WSGIClient
+
+    local = threading.local()
+    slots = threading.BoundedSemaphore(args.concurrency)
+    latencies, statuses, lock = [], {}, threading.Lock()
+
+    def request(path, queued):
+        if not hasattr(local, "client"):
+            local.client = WSGIClient(application)
+        try:
+            status = local.client.get(path).status
+        finally:
+            slots.release()
+        with lock:
+            latencies.append((time.perf_counter() - queued) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        for i in range(args.requests):
+            slots.acquire()
+            pool.submit(request, paths[i % len(paths)], time.perf_counter())
+    return summarize("wsgi", latencies, statuses, time.perf_counter() - started)
+
+
+def run_asgi(args, paths):
+    from ask_nikita.asgi import application
+    from bench.client import ASGIClient
+
+    client = ASGIClient(application)
+    latencies, statuses = [], {}
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(args.threads)
+        )
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def request(path):
+            async with slots:
+                response = await client.get(path)
+            latencies.append(response.elapsed * 1000)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        await asyncio.gather(
+            *(request(paths[i % len(paths)]) for i in range(args.requests))
+        )
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return summarize("asgi", latencies, statuses, time.perf_counter() - started)
+
+
+def main(argv=None):
+    from bench.__main__ import setup
+
+    args = parse_args(argv)
+    args.no_cache = True
+    setup(args)
+    paths = urls()
+    if args.db_latency:
+        add_latency(args.db_latency / 1000)
+
+    results = {"wsgi": run_wsgi(args, paths), "asgi": run_asgi(args, paths)}
+    report = {"meta": {k: v for k, v in vars(args).items()}, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+
+from ask_nikita.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get(
+            "BENCH_DB", os.path.join(tempfile.gettempdir(), "ask_nikita_bench.sqlite3")
+        ),
+    }
+}
+DATABASE_ROUTERS = []
+
+STATIC_ROOT = os.path.join(tempfile.gettempdir(), "ask_nikita_bench_static")
+SERVE_STATIC = True
+
+# fill_db builds avatar thumbnails, which must not land in the tracked media/
+# directory. The seeded default avatar is what generated users point at.
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), "ask_nikita_bench_media")
+os.makedirs(os.path.join(MEDIA_ROOT, "uploads"), exist_ok=True)
+shutil.copy(
+    os.path.join(BASE_DIR, "media", "uploads", "default_image.jpg"),  # noqa: F405
+    os.path.join(MEDIA_ROOT, "uploads"),
+)
+# The login scenario replays one account from one address.
+RATE_LIMITS = {}
+
+if os.environ.get("BENCH_CACHE", "1") == "0":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"null": {"class": "logging.NullHandler"}},
+    "root": {"handlers": ["null"]},
+}
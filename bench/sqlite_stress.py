@@ -0,0 +1,233 @@
+"""
+Concurrent answer posting against SQLite, with and without SQLITE_TUNED.
+
+    python -m bench.sqlite_stress --seconds 5 --writers 4 --readers 4
+
+Writer threads save answers through AddAnswerForm while reader threads
+render question listings; each mode reports completed reads and writes
+and how many of them failed with "database is locked". Then one exclusive
+write transaction is held open while readers run: the run fails unless it
+locks the readers out in the default mode, and the tuned (WAL) readers
+complete without errors and without seeing the uncommitted answer.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Longer than sqlite3's default 5 second busy timeout, so a reader blocked by
+# the held write gives up with "database is locked" instead of waiting it out.
+HOLD_SECONDS = 6
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.sqlite_stress")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--mode", choices=("default", "tuned"))
+    return parser.parse_args(argv)
+
+
+def worker(stop, counts, lock, action):
+    from django.db import OperationalError, connection
+
+    done = failed = 0
+    while not stop.is_set():
+        try:
+            action()
+            done += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            failed += 1
+    connection.close()
+    with lock:
+        counts[0] += done
+        counts[1] += failed
+
+
+def reads_during_write(args, read, write):
+    """
+    Run readers while ``write`` holds a write transaction open, then commit
+    it. Returns completed and locked reads.
+    """
+    lock = threading.Lock()
+    holding, release = threading.Event(), threading.Event()
+
+    thread = threading.Thread(target=write, args=(holding, release))
+    thread.start()
+    holding.wait()
+
+    stop = threading.Event()
+    reads = [0, 0]
+    readers = [
+        threading.Thread(target=worker, args=(stop, reads, lock, read))
+        for _ in range(args.readers)
+    ]
+    for reader in readers:
+        reader.start()
+    time.sleep(HOLD_SECONDS)
+    stop.set()
+    # Readers finish before the commit, so none can see the held row legally.
+    for reader in readers:
+        reader.join()
+    release.set()
+    thread.join()
+    return reads
+
+
+def run_mode(args):
+    db = os.path.join(
+        tempfile.gettempdir(), "ask_nikita_stress_%s.sqlite3" % args.mode
+    )
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db + suffix):
+            os.remove(db + suffix)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "bench.settings"
+    os.environ["BENCH_DB"] = db
+    os.environ["BENCH_CACHE"] = "0"
+    os.environ["SQLITE_TUNED"] = "1" if args.mode == "tuned" else "0"
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    with open(os.devnull, "w") as devnull:
+        call_command("fill_db", seed=1, questions=500, answers=500, stdout=devnull)
+
+    from questions.forms import AddAnswerForm
+    from questions.models import Question, User
+
+    user = User.objects.first()
+    question = Question.objects.first()
+
+    def write():
+        form = AddAnswerForm(
+            {"text": "stress"}, initial={"user": user, "question": question}
+        )
+        form.is_valid()
+        form.save()
+
+    def read():
+        list(Question.objects.get_question_by_date()[:10])
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    writes, reads = [0, 0], [0, 0]
+    threads = [
+        threading.Thread(target=worker, args=(stop, writes, lock, write))
+        for _ in range(args.writers)
+    ] + [
+        threading.Thread(target=worker, args=(stop, reads, lock, read))
+        for _ in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    from django.conf import settings
+    from questions.models import Answer
+
+    def held_write(holding, release):
+        # BEGIN EXCLUSIVE is where a committing writer ends up: with a
+        # rollback journal it shuts every reader out, in WAL mode readers go
+        # on from the last commit. Django 3.2 cannot open one, so this uses
+        # its own connection.
+        db = sqlite3.connect(
+            settings.DATABASES["default"]["NAME"], isolation_level=None
+        )
+        db.execute("BEGIN EXCLUSIVE")
+        db.execute(
+            "INSERT INTO %s (author_id, question_id, text, is_correct, "
+            "likes_count, dislikes_count, rating) VALUES (?, ?, 'held', 0, 0, 0, 0)"
+            % Answer._meta.db_table,
+            [user.id, question.id],
+        )
+        holding.set()
+        release.wait()
+        db.execute("COMMIT")
+        db.close()
+
+    def read_committed():
+        read()
+        if Answer.objects.filter(text="held").exists():
+            raise AssertionError("read an uncommitted answer")
+
+    held = reads_during_write(args, read_committed, held_write)
+
+    return {
+        "mode": args.mode,
+        "writes": writes[0],
+        "writes_locked": writes[1],
+        "reads": reads[0],
+        "reads_locked": reads[1],
+        "reads_per_sec": reads[0] / args.seconds,
+        "writes_per_sec": writes[0] / args.seconds,
+        "reads_during_held_write": held[0],
+        "reads_during_held_write_locked": held[1],
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.mode:
+        json.dump(run_mode(args), sys.stdout)
+        return
+
+    # Each mode runs in its own interpreter because settings are read once.
+    failures = []
+    for mode in ("default", "tuned"):
+        output = subprocess.check_output(
+            [sys.executable, "-m", "bench.sqlite_stress", "--mode", mode]
+            + ["--seconds", str(args.seconds)]
+            + ["--writers", str(args.writers), "--readers", str(args.readers)]
+        )
+        result = json.loads(output)
+        print(
+            "%-8s reads %7.1f/s (%i locked)  writes %6.1f/s (%i locked)"
+            % (
+                mode,
+                result["reads_per_sec"],
+                result["reads_locked"],
+                result["writes_per_sec"],
+                result["writes_locked"],
+            )
+        )
+        print(
+            "%-8s reads while an exclusive write is open: %i (%i locked)"
+            % (
+                mode,
+                result["reads_during_held_write"],
+                result["reads_during_held_write_locked"],
+            )
+        )
+        # A held write must lock readers out of the default profile, which
+        # is what WAL in the tuned one is for.
+        held, locked = (
+            result["reads_during_held_write"],
+            result["reads_during_held_write_locked"],
+        )
+        if (mode == "default" and not locked) or (
+            mode == "tuned" and (not held or locked)
+        ):
+            failures.append(mode)
+
+    if failures:
+        sys.exit(
+            "Reads behind an exclusive write did not behave as expected in: %s"
+            % ", ".join(failures)
+        )
+
+
+if __name__ == "__main__":
+    main()
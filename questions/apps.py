@@ -1,5 +1,33 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class QuestionsConfig(AppConfig):
     name = "questions"
+    default_auto_field = "django.db.models.AutoField"
+
+    def ready(self):
+        from . import pagecache, reputation, signals
+        from .auth import on_user_changed
+        from .checks import check_cached_sessions, check_shared_cache
+        from .middleware import install_timed_execute
+        from .models import User
+        from .search import create_search_index
+        from .sqlite import apply_pragmas
+
+        checks.register(check_shared_cache)
+        checks.register(check_cached_sessions)
+        post_migrate.connect(create_search_index, sender=self)
+        connection_created.connect(apply_pragmas)
+        connection_created.connect(install_timed_execute)
+        post_save.connect(on_user_changed, sender=User)
+        post_delete.connect(on_user_changed, sender=User)
+
+        signals.question_created.connect(pagecache.on_question_created)
+        signals.answer_created.connect(pagecache.on_answer_created)
+        signals.answer_accepted.connect(pagecache.on_answer_accepted)
+        signals.answer_accepted.connect(reputation.on_answer_accepted)
+        signals.vote_cast.connect(pagecache.on_vote_cast)
+        signals.vote_cast.connect(reputation.on_vote_cast)
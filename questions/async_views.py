@@ -0,0 +1,123 @@
+"""
+Async versions of the read-only pages, routed by ``ask_nikita.asgi``.
+
+Each page runs its own query and the sidebar lookup at the same time on
+worker threads (the ORM is sync-only here) instead of one after the other.
+Anything but a GET is handed to the sync view in ``views``.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+from . import views
+from .forms import AddAnswerForm
+from .models import ANSWERS_PER_PAGE, Answer, Question, Tag, TaggedQuestion
+from .pagecache import cache_for_anonymous
+from .sidebar import get_sidebar
+from .threads import in_thread
+from .views import paginate, seek_paginate
+
+
+async def with_sidebar(page):
+    return await asyncio.gather(in_thread(page)(), in_thread(get_sidebar)())
+
+
+async def render_page(request, template, page, sidebar, **context):
+    context.update(paginate=page, tags=sidebar["tags"], users=sidebar["users"])
+    return await in_thread(render)(request, template, context)
+
+
+def is_read(request):
+    return request.method in ("GET", "HEAD")
+
+
+@cache_for_anonymous("index", lambda: ["index"])
+async def index(request):
+    if not is_read(request):
+        return await sync_to_async(views.index)(request)
+
+    def page():
+        return seek_paginate(
+            Question.objects.get_question_by_date(),
+            10,
+            request,
+            ("-create_date", "-id"),
+            "index",
+        )
+
+    q, sidebar = await with_sidebar(page)
+    return await render_page(request, "questions/index.html", q, sidebar)
+
+
+@cache_for_anonymous("question", lambda id: ["question:%s" % id])
+async def question(request, id):
+    if not is_read(request):
+        return await sync_to_async(views.question)(request, id)
+
+    def page():
+        q = Question.objects.get_question_by_id(id)
+        answers = paginate(
+            Answer.objects.get_answers_by_id(q.id),
+            ANSWERS_PER_PAGE,
+            request,
+            q.answers_count,
+        )
+        answers.object_list = list(answers.object_list)
+        return q, answers
+
+    try:
+        (q, answers), sidebar = await with_sidebar(page)
+    except Question.DoesNotExist:
+        return await in_thread(render)(request, "404.html")
+    return await render_page(
+        request,
+        "questions/question_page.html",
+        answers,
+        sidebar,
+        form=AddAnswerForm(),
+        question=q,
+    )
+
+
+@cache_for_anonymous("tag", lambda tagname: ["tag:%s" % tagname])
+async def tag(request, tagname):
+    if not is_read(request) or Tag.objects.normalize(tagname) != tagname:
+        return await sync_to_async(views.tag)(request, tagname)
+
+    def page():
+        questions = seek_paginate(
+            TaggedQuestion.objects.get_by_tag(tagname),
+            10,
+            request,
+            ("-create_date", "-question_id"),
+            "tag:%s" % tagname,
+        )
+        questions.object_list = Question.objects.get_questions_in_order(
+            [row.question_id for row in questions.object_list]
+        )
+        return questions
+
+    try:
+        questions, sidebar = await with_sidebar(page)
+    except Exception:
+        return await in_thread(render)(request, "404.html")
+    return await render_page(
+        request, "questions/question_tag.html", questions, sidebar, tag=tagname
+    )
+
+
+@cache_for_anonymous("hot", lambda: ["hot"])
+async def hot(request):
+    if not is_read(request):
+        return await sync_to_async(views.hot)(request)
+
+    def page():
+        return seek_paginate(
+            Question.objects.get_question_by_popular(),
+            10,
+            request,
+            ("-hot_score", "-id"),
+            "hot",
+        )
+
+    q, sidebar = await with_sidebar(page)
+    return await render_page(request, "questions/index.html", q, sidebar)
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_KEY = "questions:user:%s"
+
+# Enough for the navbar, permission checks and the session hash check;
+# anything else is loaded on first access.
+SESSION_USER_FIELDS = (
+    "id",
+    "username",
+    "nickname",
+    "upload",
+    "thumbnails_ready",
+    "password",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+def user_cache_timeout():
+    return getattr(settings, "USER_CACHE_TIMEOUT", 300)
+
+
+def forget_users(*ids):
+    cache.delete_many([USER_KEY % pk for pk in ids])
+
+
+def on_user_changed(sender, instance, **kwargs):
+    forget_users(instance.pk)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose ``get_user`` (run once per authenticated request)
+    is served from the cache instead of a users table lookup. A cache
+    private to each process could not be invalidated everywhere when the
+    password changes, so it is only used with ``SHARED_CACHE``.
+    """
+
+    def get_user(self, user_id):
+        if not getattr(settings, "SHARED_CACHE", False):
+            return super().get_user(user_id)
+        key = USER_KEY % user_id
+        user = cache.get(key)
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User._default_manager.only(*SESSION_USER_FIELDS).get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, user_cache_timeout())
+        return user if self.user_can_authenticate(user) else None
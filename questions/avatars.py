@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"jpeg": "jpg", "webp": "webp"}
+# Metadata Pillow reads from uploads. EXIF can carry the GPS position.
+METADATA = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+_executor = None
+
+
+def avatar_sizes():
+    return getattr(settings, "AVATAR_SIZES", (64, 128))
+
+
+def avatar_upload_to(instance, filename):
+    # uploads/<h[:2]>/<h[2:4]>/<sha256>.<ext> keeps every directory small.
+    digest = hashlib.sha256()
+    upload = instance.upload
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    h = digest.hexdigest()
+    ext = os.path.splitext(filename)[1].lower() or ".jpg"
+    return "uploads/%s/%s/%s%s" % (h[:2], h[2:4], h, ext)
+
+
+def thumbnail_name(name, size, fmt):
+    return "thumbs/%s/%i.%s" % (os.path.splitext(name)[0], size, FORMATS[fmt])
+
+
+def replace_file(name, data):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(data))
+
+
+def strip_metadata(name, data):
+    """
+    Re-encode the original without its metadata, with the EXIF orientation
+    applied to the pixels. Clean files are left alone, so running this again
+    does not recompress them.
+    """
+    image = Image.open(BytesIO(data))
+    fmt = image.format
+    if not image.getexif() and not set(image.info) & set(METADATA):
+        return data
+
+    image = ImageOps.exif_transpose(image)
+    image.info = {
+        key: image.info[key]
+        for key in ("transparency", "icc_profile")
+        if key in image.info
+    }
+    if fmt == "JPEG" and image.mode not in ("RGB", "L", "CMYK"):
+        image = image.convert("RGB")
+    out = BytesIO()
+    image.save(out, fmt, quality=90)
+    replace_file(name, out.getvalue())
+    return out.getvalue()
+
+
+def build_thumbnails(name):
+    with default_storage.open(name) as f:
+        data = f.read()
+
+    # verify() only checks structure, the image has to be reopened to decode
+    Image.open(BytesIO(data)).verify()
+    data = strip_metadata(name, data)
+    image = Image.open(BytesIO(data)).convert("RGB")
+
+    for size in avatar_sizes():
+        thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for fmt in FORMATS:
+            out = BytesIO()
+            thumb.save(out, fmt.upper(), quality=85, optimize=True)
+            replace_file(thumbnail_name(name, size, fmt), out.getvalue())
+
+
+def process_avatar(name):
+    from .auth import forget_users
+    from .models import User
+
+    try:
+        build_thumbnails(name)
+    except Exception:
+        logger.exception("Could not build thumbnails for %s", name)
+    else:
+        users = User.objects.filter(upload=name)
+        ids = list(users.values_list("id", flat=True))
+        users.update(thumbnails_ready=True)
+        forget_users(*ids)
+    finally:
+        connection.close()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            getattr(settings, "AVATAR_WORKERS", 2), thread_name_prefix="avatars"
+        )
+    return _executor
+
+
+def schedule_avatar(user):
+    name = user.upload.name
+    if name:
+        transaction.on_commit(lambda: executor().submit(process_avatar, name))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Warning
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or getattr(settings, "SHARED_CACHE", False):
+        return []
+    return [
+        Warning(
+            "The cache is private to each process.",
+            hint=(
+                "Set CACHE_URL to memcached:// or redis:// so workers and "
+                "refresh_sidebar share the sidebar, page cache versions, "
+                "rate limits and the leaderboard."
+            ),
+            id="questions.W001",
+        )
+    ]
+
+
+def check_cached_sessions(app_configs, **kwargs):
+    if getattr(settings, "SHARED_CACHE", False) or settings.SESSION_ENGINE not in (
+        "django.contrib.sessions.backends.cache",
+        "django.contrib.sessions.backends.cached_db",
+    ):
+        return []
+    return [
+        Warning(
+            "Sessions are cached in a cache private to each process.",
+            hint=(
+                "A logout or password change only drops the session in one "
+                "worker. Use SESSION_BACKEND=db or set CACHE_URL to "
+                "memcached:// or redis://."
+            ),
+            id="questions.W002",
+        )
+    ]
@@ -0,0 +1,240 @@
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+import time
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import (
+    User,
+    Tag,
+    Question,
+    TaggedQuestion,
+    Answer,
+    QuestionLikes,
+    QuestionDislikes,
+    AnswerLikes,
+    AnswerDislikes,
+)
+
+MANIFEST = "manifest.json"
+CHECKPOINT = "checkpoint.json"
+IMPORT_CHECKPOINT = "import-checkpoint.json"
+IMPORT_IDS = "import-ids.sqlite3"
+
+
+class Table:
+    """
+    One model in the corpus. ``derived`` columns are not exported but rebuilt
+    after import, ``remap`` maps foreign keys to the table they point into,
+    rows with an existing ``natural_key`` are merged instead of inserted,
+    and only ``mapped`` tables record their new primary keys.
+    """
+
+    def __init__(
+        self, name, model, derived=(), remap=None, natural_key=None, mapped=True
+    ):
+        self.name = name
+        self.model = model
+        self.derived = derived
+        self.remap = remap or {}
+        self.natural_key = natural_key
+        self.mapped = mapped
+
+    @property
+    def filename(self):
+        return "%s.jsonl.gz" % self.name
+
+    @property
+    def fields(self):
+        return [
+            field.attname
+            for field in self.model._meta.concrete_fields
+            if not field.primary_key and field.attname not in self.derived
+        ]
+
+    def build(self, row):
+        opts = self.model._meta
+        return self.model(
+            **{name: opts.get_field(name).to_python(row[name]) for name in self.fields}
+        )
+
+
+# In dependency order: every table only points into tables listed before it.
+TABLES = (
+    Table("users", User, ("reputation", "thumbnails_ready"), natural_key="username"),
+    Table("tags", Tag, ("questions_count",), natural_key="title"),
+    Table(
+        "questions",
+        Question,
+        ("likes_count", "dislikes_count", "answers_count", "rating", "hot_score"),
+        {"author_id": "users"},
+    ),
+    Table(
+        "tagged_questions",
+        TaggedQuestion,
+        remap={"question_id": "questions", "tag_id": "tags"},
+        mapped=False,
+    ),
+    Table(
+        "answers",
+        Answer,
+        ("likes_count", "dislikes_count", "rating"),
+        {"author_id": "users", "question_id": "questions"},
+    ),
+    Table(
+        "question_likes",
+        QuestionLikes,
+        remap={"question_id": "questions", "user_id": "users"},
+        mapped=False,
+    ),
+    Table(
+        "question_dislikes",
+        QuestionDislikes,
+        remap={"question_id": "questions", "user_id": "users"},
+        mapped=False,
+    ),
+    Table(
+        "answer_likes",
+        AnswerLikes,
+        remap={"answer_id": "answers", "user_id": "users"},
+        mapped=False,
+    ),
+    Table(
+        "answer_dislikes",
+        AnswerDislikes,
+        remap={"answer_id": "answers", "user_id": "users"},
+        mapped=False,
+    ),
+)
+
+
+class Checkpoint:
+    """Per-table progress in a JSON file, replaced atomically on every save."""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, name, default=None):
+        return self.state.get(name, default)
+
+    def save(self, name, value):
+        self.state[name] = value
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class IdMap:
+    """
+    Old to new primary keys of imported rows, kept in a SQLite file rather
+    than in memory so large imports run in constant memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS ids "
+            "(tbl TEXT, old INTEGER, new INTEGER, PRIMARY KEY (tbl, old))"
+        )
+
+    def add(self, table, pairs):
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO ids VALUES (?, ?, ?)",
+                ((table, old, new) for old, new in pairs),
+            )
+
+    def get(self, table, olds):
+        olds = list(set(olds))
+        found = {}
+        # stays under SQLite's limit of 999 variables
+        for start in range(0, len(olds), 900):
+            part = olds[start : start + 900]
+            found.update(
+                self.db.execute(
+                    "SELECT old, new FROM ids WHERE tbl = ? AND old IN (%s)"
+                    % ",".join("?" * len(part)),
+                    [table] + part,
+                )
+            )
+        return found
+
+    def remove(self):
+        self.db.close()
+        os.remove(self.path)
+
+
+class CorpusEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes to milliseconds, an import has to get
+    # back the exact timestamps.
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def write_chunk(f, rows):
+    # Each chunk is a gzip member of its own, members concatenate into one
+    # valid stream, so a resumed export truncates to the last checkpoint and
+    # appends.
+    data = "".join(json.dumps(row, cls=CorpusEncoder) + "\n" for row in rows)
+    f.write(gzip.compress(data.encode(), mtime=0))
+
+
+def read_rows(path, skip=0):
+    with gzip.open(path, "rt") as f:
+        for number, line in enumerate(f):
+            if number >= skip:
+                yield json.loads(line)
+
+
+def last_id(model):
+    return model.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def new_ids(model, after, count):
+    # bulk_create keeps insertion order and the bulk loader is the only writer
+    return list(
+        model.objects.filter(id__gt=after)
+        .order_by("id")
+        .values_list("id", flat=True)[:count]
+    )
+
+
+def report(stdout, name, count, started, size=None):
+    elapsed = time.perf_counter() - started
+    line = "%s: %i rows in %.1fs (%.0f rows/sec)" % (
+        name,
+        count,
+        elapsed,
+        count / max(elapsed, 1e-9),
+    )
+    if size is not None:
+        line += ", %.1f MB compressed (%.1f MB/sec)" % (
+            size / 1e6,
+            size / 1e6 / max(elapsed, 1e-9),
+        )
+    stdout.write(line)
+    return count
+
+
+def rebuild_derived(stdout):
+    # Bulk inserts skip the per-row counter hooks, rebuild once instead.
+    call_command("recount_counters", stdout=stdout)
+    call_command("decay_hot_scores", stdout=stdout)
+    call_command("rebuild_search_index", stdout=stdout)
+    call_command("compact_tag_activity", rebuild=True, stdout=stdout)
+    call_command("rebuild_reputation", stdout=stdout)
+    call_command("refresh_sidebar", stdout=stdout)
+    call_command("build_avatars", stdout=stdout)
@@ -0,0 +1,94 @@
+import base64
+import hashlib
+from django.conf import settings
+from django.contrib.auth.hashers import BasePasswordHasher, mask_hash
+from django.utils.crypto import constant_time_compare
+
+
+class ScryptPasswordHasher(BasePasswordHasher):
+    """
+    Memory-hard scrypt hashing from the standard library. The cost is read
+    from SCRYPT_WORK_FACTOR/SCRYPT_BLOCK_SIZE/SCRYPT_PARALLELISM, and hashes
+    made with other parameters are re-encoded on the next successful login.
+    A 32 byte key keeps the encoded hash inside the 128 character column.
+    """
+
+    algorithm = "scrypt"
+    maxmem = 0
+
+    @property
+    def work_factor(self):
+        return getattr(settings, "SCRYPT_WORK_FACTOR", 2 ** 14)
+
+    @property
+    def block_size(self):
+        return getattr(settings, "SCRYPT_BLOCK_SIZE", 8)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "SCRYPT_PARALLELISM", 1)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and "$" not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        # scrypt needs about 128 * n * r bytes, OpenSSL refuses more than maxmem
+        hash = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=self.maxmem or 256 * n * r,
+            dklen=32,
+        )
+        hash = base64.b64encode(hash).decode("ascii").strip()
+        return "%s$%d$%s$%d$%d$%s" % (self.algorithm, n, salt, r, p, hash)
+
+    def decode(self, encoded):
+        algorithm, n, salt, r, p, hash = encoded.split("$", 6)
+        assert algorithm == self.algorithm
+        return {
+            "algorithm": algorithm,
+            "work_factor": int(n),
+            "salt": salt,
+            "block_size": int(r),
+            "parallelism": int(p),
+            "hash": hash,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password,
+            decoded["salt"],
+            decoded["work_factor"],
+            decoded["block_size"],
+            decoded["parallelism"],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            "algorithm": decoded["algorithm"],
+            "work factor": decoded["work_factor"],
+            "salt": mask_hash(decoded["salt"]),
+            "block size": decoded["block_size"],
+            "parallelism": decoded["parallelism"],
+            "hash": mask_hash(decoded["hash"]),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded["work_factor"] != self.work_factor
+            or decoded["block_size"] != self.block_size
+            or decoded["parallelism"] != self.parallelism
+        )
+
+    def harden_runtime(self, password, encoded):
+        # The runtime difference between parameter sets is not hidden.
+        pass
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.recorder import MigrationRecorder
+from questions.models import Question, Tag, User
+
+
+class Command(BaseCommand):
+    help = (
+        "This command marks questions.0001_initial as applied on a database "
+        "created with migrate --run-syncdb, so migrate can upgrade it"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        recorder = MigrationRecorder(connection)
+        if ("questions", "0001_initial") in recorder.applied_migrations():
+            self.stdout.write("questions.0001_initial is already applied")
+            return
+
+        tables = set(connection.introspection.table_names())
+        expected = {model._meta.db_table for model in (User, Tag, Question)}
+        if not expected <= tables:
+            raise CommandError(
+                "%s has no questions tables, run migrate instead"
+                % options["database"]
+            )
+        recorder.record_applied("questions", "0001_initial")
+        self.stdout.write("Marked questions.0001_initial as applied")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from questions.avatars import executor, process_avatar
+from questions.models import User
+
+
+class Command(BaseCommand):
+    help = "This command builds missing avatar thumbnails"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Rebuild thumbnails of every avatar"
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(upload="")
+        if not options["all"]:
+            users = users.filter(thumbnails_ready=False)
+        names = list(users.order_by().values_list("upload", flat=True).distinct())
+
+        list(executor().map(process_avatar, names))
+        self.stdout.write("Built thumbnails for %i avatars" % len(names))
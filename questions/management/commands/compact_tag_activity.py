@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from questions.models import TagActivity, TaggedQuestion
+
+
+class Command(BaseCommand):
+    help = "This command folds old hourly tag activity into daily buckets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recreate the buckets from tagged questions first",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        hourly = timedelta(
+            hours=getattr(settings, "TRENDING_HOURLY_RETENTION_HOURS", 48)
+        )
+        daily = timedelta(days=getattr(settings, "TRENDING_DAILY_RETENTION_DAYS", 90))
+
+        if options["rebuild"]:
+            self.rebuild(now - daily)
+
+        folded, dropped = TagActivity.objects.compact(now, hourly, daily)
+        self.stdout.write(
+            "Folded %i hourly buckets, dropped %i daily buckets" % (folded, dropped)
+        )
+
+    def rebuild(self, since):
+        rows = (
+            TaggedQuestion.objects.filter(create_date__gte=since)
+            .annotate(start=TruncHour("create_date"))
+            .values("tag_id", "start")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        with transaction.atomic():
+            TagActivity.objects.all().delete()
+            TagActivity.objects.bulk_create(
+                (
+                    TagActivity(
+                        tag_id=row["tag_id"],
+                        resolution=TagActivity.HOUR,
+                        start=row["start"],
+                        count=row["n"],
+                    )
+                    for row in rows.iterator()
+                ),
+                batch_size=1000,
+            )
@@ -0,0 +1,46 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from questions.models import Question, hot_score
+
+
+class Command(BaseCommand):
+    help = "This command re-decays stored hot scores of questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Only re-decay questions created during the last N days",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        questions = Question.objects.order_by()
+        if options["days"] is not None:
+            questions = questions.filter(
+                create_date__gte=now - timedelta(days=options["days"])
+            )
+
+        rows = questions.values_list("id", "rating", "answers_count", "create_date")
+        batch = []
+        total = 0
+        for pk, rating, answers, create_date in rows.iterator():
+            batch.append(
+                Question(id=pk, hot_score=hot_score(rating, answers, create_date, now))
+            )
+            if len(batch) >= options["batch_size"]:
+                total += self.flush(batch)
+                batch = []
+        total += self.flush(batch)
+
+        self.stdout.write("Re-decayed %i questions" % total)
+
+    def flush(self, batch):
+        if batch:
+            with transaction.atomic():
+                Question.objects.bulk_update(batch, ["hot_score"])
+        return len(batch)
@@ -0,0 +1,87 @@
+import json
+import os
+import time
+from django.core.management.base import BaseCommand
+from questions.corpus import (
+    CHECKPOINT,
+    MANIFEST,
+    TABLES,
+    Checkpoint,
+    last_id,
+    report,
+    write_chunk,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "This command streams users, tags, questions, answers and votes to "
+        "gzipped JSONL files, resuming from its checkpoint when interrupted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore an existing checkpoint"
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        os.makedirs(directory, exist_ok=True)
+        checkpoint = Checkpoint(os.path.join(directory, CHECKPOINT))
+        if options["restart"]:
+            checkpoint.remove()
+            checkpoint = Checkpoint(checkpoint.path)
+        if os.path.exists(os.path.join(directory, MANIFEST)):
+            os.remove(os.path.join(directory, MANIFEST))
+
+        # Rows written after the export started are left out, so every table
+        # stops at the same moment.
+        if checkpoint.get("stop") is None:
+            checkpoint.save("stop", {t.name: last_id(t.model) for t in TABLES})
+        stop = checkpoint.get("stop")
+
+        started = time.perf_counter()
+        counts = {}
+        for table in TABLES:
+            counts[table.name] = self.export(
+                table, directory, checkpoint, stop[table.name], options["chunk_size"]
+            )
+
+        with open(os.path.join(directory, MANIFEST), "w") as f:
+            json.dump({"rows": counts}, f, indent=2)
+            f.write("\n")
+        checkpoint.remove()
+        report(self.stdout, "Exported", sum(counts.values()), started)
+
+    def export(self, table, directory, checkpoint, stop, chunk_size):
+        started = time.perf_counter()
+        state = checkpoint.get(table.name, {"last": 0, "size": 0, "rows": 0})
+        rows = (
+            table.model.objects.filter(id__lte=stop)
+            .order_by("id")
+            .values("id", *table.fields)
+        )
+
+        path = os.path.join(directory, table.filename)
+        with open(path, "ab") as f:
+            # drops a chunk that was half written when the last run stopped
+            f.truncate(state["size"])
+            exported = 0
+            while True:
+                chunk = list(rows.filter(id__gt=state["last"])[:chunk_size])
+                if not chunk:
+                    break
+                write_chunk(f, chunk)
+                f.flush()
+                exported += len(chunk)
+                state = {
+                    "last": chunk[-1]["id"],
+                    "size": f.tell(),
+                    "rows": state["rows"] + len(chunk),
+                }
+                checkpoint.save(table.name, state)
+
+        report(self.stdout, table.name, exported, started, os.path.getsize(path))
+        return state["rows"]
@@ -1,160 +1,242 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
 from faker import Faker
+from questions.corpus import last_id, new_ids, rebuild_derived, report
 from questions.models import (
     User,
     Tag,
     Question,
+    TaggedQuestion,
     QuestionLikes,
     Answer,
     AnswerLikes,
     QuestionDislikes,
     AnswerDislikes,
 )
-import random
+
+
+def fake_users(seed, count):
+    faker = Faker()
+    faker.seed_instance(seed)
+    return [(faker.first_name(), faker.last_name()) for _ in range(count)]
+
+
+def fake_questions(seed, count):
+    faker = Faker()
+    faker.seed_instance(seed)
+    return [
+        (
+            faker.sentence(nb_words=6, variable_nb_words=True)[:120],
+            faker.text(max_nb_chars=100),
+        )
+        for _ in range(count)
+    ]
+
+
+def fake_answers(seed, count):
+    faker = Faker()
+    faker.seed_instance(seed)
+    return [faker.text(max_nb_chars=200) for _ in range(count)]
 
 
 class Command(BaseCommand):
     help = "This command fills existing tables in your data base"
 
-    def handle(self, *args, **options):
-        self.create_tags()
-        self.create_users()
-        self.create_questions()
-        self.create_question_likes()
-        self.create_question_dislikes()
-        self.create_answers()
-        self.create_answer_likes()
-        self.create_answer_dislikes()
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--tags", type=int, default=10)
+        parser.add_argument("--questions", type=int, default=100)
+        parser.add_argument("--answers", type=int, default=100)
+        parser.add_argument(
+            "--votes",
+            type=int,
+            default=100,
+            help="Question votes to create, and as many answer votes",
+        )
+        parser.add_argument(
+            "--ratio", type=float, default=0.7, help="Share of votes that are likes"
+        )
+        parser.add_argument("--tags-per-question", type=int, default=3)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes generating fake text, 1 generates in-process",
+        )
+        parser.add_argument("--seed", type=int, default=None)
 
-    def create_users(self):
-        faker = Faker()
-        for i in range(10):
-            user = User()
-            user.first_name = faker.first_name()
-            user.last_name = faker.last_name()
-            user.password = "12345"
-            user.username = user.first_name + user.last_name
-            user.save()
+    def handle(self, *args, **options):
+        if not 0 <= options["ratio"] <= 1:
+            raise CommandError("--ratio must be between 0 and 1")
+
+        self.options = options
+        self.batch_size = options["batch_size"]
+        self.random = random.Random(options["seed"])
+        self.now = timezone.now()
+        self.pool = None
+        if options["workers"] > 1:
+            self.pool = ProcessPoolExecutor(options["workers"])
+
+        started = time.perf_counter()
+        total = 0
+        try:
+            total += self.create_tags()
+            total += self.create_users()
+            total += self.create_questions()
+            total += self.create_answers()
+            total += self.create_votes(Question, QuestionLikes, QuestionDislikes)
+            total += self.create_votes(Answer, AnswerLikes, AnswerDislikes)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+        rebuild_derived(self.stdout)
+        report(self.stdout, "Inserted", total, started)
+
+    def generate(self, func, count):
+        # Yields fake rows chunk by chunk, in order, from the process pool
+        # when there is one.
+        chunks = [
+            (self.random.getrandbits(32), min(self.batch_size, count - start))
+            for start in range(0, count, self.batch_size)
+        ]
+        if self.pool is None:
+            return (func(*chunk) for chunk in chunks)
+        return self.pool.map(func, *zip(*chunks)) if chunks else iter(())
+
+    def insert(self, model, rows):
+        with transaction.atomic():
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
 
     def create_tags(self):
+        started = time.perf_counter()
         faker = Faker()
-        random_tags = faker.words(nb=10, ext_word_list=None)
-        for tag in random_tags:
-            t = Tag()
-            t.title = tag
-            t.save()
+        faker.seed_instance(self.random.getrandbits(32))
+        existing = set(Tag.objects.values_list("title", flat=True))
+        titles = []
+        for i in range(self.options["tags"]):
+            title = Tag.objects.normalize(faker.word())
+            if title in existing:
+                title = "%s%i" % (title, i)
+            existing.add(title)
+            titles.append(title)
+        self.insert(Tag, [Tag(title=title) for title in titles])
+        self.tag_ids = list(Tag.objects.values_list("id", flat=True))
+        return report(self.stdout, "tags", len(titles), started)
+
+    def create_users(self):
+        started = time.perf_counter()
+        password = make_password("12345")
+        number = last_id(User)
+        for chunk in self.generate(fake_users, self.options["users"]):
+            users = []
+            for first_name, last_name in chunk:
+                number += 1
+                users.append(
+                    User(
+                        first_name=first_name,
+                        last_name=last_name,
+                        username="%s%s%i" % (first_name, last_name, number),
+                        nickname=first_name,
+                        password=password,
+                        upload="uploads/default_image.jpg",
+                    )
+                )
+            self.insert(User, users)
+        self.user_ids = list(User.objects.values_list("id", flat=True))
+        return report(self.stdout, "users", self.options["users"], started)
 
     def create_questions(self):
-        fake = Faker()
-        tags_set = Tag.objects.all()
-        author_set = User.objects.all()
-        print()
-        for i in range(100):
-            post = Question()
-            post.author = random.choice(author_set)
-            post.title = fake.sentence(
-                nb_words=6, variable_nb_words=True, ext_word_list=None
+        started = time.perf_counter()
+        count = 0
+        per_question = min(self.options["tags_per_question"], len(self.tag_ids))
+        year = 365 * 24 * 3600
+        for chunk in self.generate(fake_questions, self.options["questions"]):
+            after = last_id(Question)
+            dates = [
+                self.now - timedelta(seconds=self.random.randrange(year))
+                for _ in chunk
+            ]
+            self.insert(
+                Question,
+                [
+                    Question(
+                        author_id=self.random.choice(self.user_ids),
+                        title=title,
+                        text=text,
+                        create_date=date,
+                    )
+                    for (title, text), date in zip(chunk, dates)
+                ],
             )
-            post.text = fake.text(max_nb_chars=100, ext_word_list=None)
-            post.create_date = fake.date(pattern="%Y-%m-%d", end_datetime=None)
-            post.id = i
-            post.save()
-
-            for j in range(3):
-                t = random.choice(tags_set)
-                post.tags.add(t)
-
-    def create_question_likes(self):
-        question_set = Question.objects.all_questions()
-        user_set = User.objects.all_users()
-        pairs = []
-        temp = [0, 0]
-        j = 0
-        for i in range(Question.objects.count()):
-            like = QuestionLikes()
-            like.question = random.choice(question_set)
-            like.user = random.choice(user_set)
-            temp[0] = like.question
-            temp[1] = like.user
-            if temp not in pairs:
-                pairs.append([])
-                pairs[j].append(like.question)
-                pairs[j].append(like.user)
-                like.save()
-                j += 1
-
-    def create_question_dislikes(self):
-        question_set = Question.objects.all_questions()
-        user_set = User.objects.all_users()
-        pairs = []
-        temp = [0, 0]
-        j = 0
-
-        for i in range(Question.objects.count()):
-            dislike = QuestionDislikes()
-            dislike.question = random.choice(question_set)
-            dislike.user = random.choice(user_set)
-            temp[0] = dislike.question
-            temp[1] = dislike.user
-            if temp not in pairs:
-                pairs.append([])
-                pairs[j].append(dislike.question)
-                pairs[j].append(dislike.user)
-                dislike.save()
-                j += 1
+            # bulk_create keeps insertion order, so new ids line up with dates
+            ids = new_ids(Question, after, len(chunk))
+            self.insert(
+                TaggedQuestion,
+                [
+                    TaggedQuestion(question_id=pk, tag_id=tag_id, create_date=date)
+                    for pk, date in zip(ids, dates)
+                    for tag_id in self.random.sample(self.tag_ids, per_question)
+                ],
+            )
+            count += len(chunk) * (1 + per_question)
+        self.question_ids = list(Question.objects.values_list("id", flat=True))
+        return report(self.stdout, "questions", count, started)
 
     def create_answers(self):
-        faker = Faker()
-
-        question_set = Question.objects.all()
-        author_set = User.objects.all()
-
-        for i in range(100):
-            answer = Answer()
-            answer.author = random.choice(author_set)
-            answer.question = random.choice(question_set)
-            answer.text = faker.text(max_nb_chars=200, ext_word_list=None)
-            try:
-                answer.save()
-            except:
-                print("Answer repeated")
-
-    def create_answer_likes(self):
-        answer_set = Answer.objects.all_answers()
-        user_set = User.objects.all_users()
-        pairs = []
-        temp = [0, 0]
-        j = 0
-
-        for i in range(Answer.objects.count()):
-            like = AnswerLikes()
-            like.answer = random.choice(answer_set)
-            like.user = random.choice(user_set)
-            temp[0] = like.answer
-            temp[1] = like.user
-            if temp not in pairs:
-                pairs.append([])
-                pairs[j].append(like.answer)
-                pairs[j].append(like.user)
-                like.save()
-                j += 1
-
-    def create_answer_dislikes(self):
-        answer_set = Answer.objects.all_answers()
-        user_set = User.objects.all_users()
+        started = time.perf_counter()
+        for chunk in self.generate(fake_answers, self.options["answers"]):
+            self.insert(
+                Answer,
+                [
+                    Answer(
+                        author_id=self.random.choice(self.user_ids),
+                        question_id=self.random.choice(self.question_ids),
+                        text=text,
+                    )
+                    for text in chunk
+                ],
+            )
+        self.answer_ids = list(Answer.objects.values_list("id", flat=True))
+        return report(self.stdout, "answers", self.options["answers"], started)
+
+    def create_votes(self, target, likes, dislikes):
+        started = time.perf_counter()
+        targets = self.answer_ids if target is Answer else self.question_ids
+        key = target._meta.model_name + "_id"
+        existing = set()
+        for model in (likes, dislikes):
+            existing.update(model.objects.values_list(key, "user_id"))
+
+        # Every (target, user) pair is one integer of range(targets * users);
+        # sampling without replacement yields unique pairs with no duplicate
+        # search, and a pair never gets both a like and a dislike.
+        users = len(self.user_ids)
+        population = len(targets) * users
+        count = min(self.options["votes"], population - len(existing))
         pairs = []
-        temp = [0, 0]
-        j = 0
-
-        for i in range(Answer.objects.count()):
-            dislike = AnswerDislikes()
-            dislike.answer = random.choice(answer_set)
-            dislike.user = random.choice(user_set)
-            temp[0] = dislike.answer
-            temp[1] = dislike.user
-            if temp not in pairs:
-                pairs.append([])
-                pairs[j].append(dislike.answer)
-                pairs[j].append(dislike.user)
-                dislike.save()
-                j += 1
+        for code in self.random.sample(range(population), count + len(existing)):
+            pair = targets[code // users], self.user_ids[code % users]
+            if pair not in existing:
+                pairs.append(pair)
+        pairs = pairs[:count]
+
+        split = int(len(pairs) * self.options["ratio"])
+        for model, chunk in ((likes, pairs[:split]), (dislikes, pairs[split:])):
+            for start in range(0, len(chunk), self.batch_size):
+                self.insert(
+                    model,
+                    [
+                        model(**{key: pk, "user_id": user_id})
+                        for pk, user_id in chunk[start : start + self.batch_size]
+                    ],
+                )
+        name = "%s votes" % target._meta.model_name
+        return report(self.stdout, name, len(pairs), started)
@@ -0,0 +1,146 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from questions.corpus import (
+    IMPORT_CHECKPOINT,
+    IMPORT_IDS,
+    MANIFEST,
+    TABLES,
+    Checkpoint,
+    IdMap,
+    last_id,
+    new_ids,
+    read_rows,
+    rebuild_derived,
+    report,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "This command loads a corpus written by export_corpus in bulk_create "
+        "batches, resuming from its checkpoint when interrupted. Nothing else "
+        "may write to the database while it runs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore an existing checkpoint"
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        if not os.path.exists(os.path.join(directory, MANIFEST)):
+            raise CommandError(
+                "%s has no %s, run export_corpus to completion first"
+                % (directory, MANIFEST)
+            )
+
+        self.batch_size = options["batch_size"]
+        self.checkpoint = Checkpoint(os.path.join(directory, IMPORT_CHECKPOINT))
+        self.ids = IdMap(os.path.join(directory, IMPORT_IDS))
+        if options["restart"]:
+            self.checkpoint.remove()
+            self.ids.remove()
+            self.checkpoint = Checkpoint(self.checkpoint.path)
+            self.ids = IdMap(self.ids.path)
+
+        started = time.perf_counter()
+        total = 0
+        for table in TABLES:
+            total += self.load(table, os.path.join(directory, table.filename))
+
+        rebuild_derived(self.stdout)
+
+        self.ids.remove()
+        self.checkpoint.remove()
+        report(self.stdout, "Imported", total, started)
+
+    def load(self, table, path):
+        state = self.checkpoint.get(
+            table.name, {"line": 0, "pending": None, "done": False}
+        )
+        if state["done"]:
+            return 0
+
+        started = time.perf_counter()
+        self.skipped = 0
+        loaded = 0
+        batch = []
+        for row in read_rows(path, skip=state["line"]):
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                state = self.load_batch(table, batch, state)
+                loaded += len(batch)
+                batch = []
+        if batch:
+            state = self.load_batch(table, batch, state)
+            loaded += len(batch)
+        self.checkpoint.save(table.name, dict(state, done=True))
+
+        report(self.stdout, table.name, loaded, started)
+        if self.skipped:
+            self.stdout.write(
+                "%s: skipped %i rows pointing at rows missing from the export"
+                % (table.name, self.skipped)
+            )
+        return loaded
+
+    def load_batch(self, table, batch, state):
+        model = table.model
+        rows = self.remap(table, batch)
+        if table.natural_key:
+            rows = self.merge(table, rows)
+
+        pending = state["pending"]
+        if pending is not None and model.objects.filter(id__gt=pending).exists():
+            # committed just before the last run stopped
+            after = pending
+        else:
+            after = last_id(model)
+            if table.mapped and rows:
+                self.checkpoint.save(table.name, dict(state, pending=after))
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [table.build(row) for row in rows],
+                    batch_size=self.batch_size,
+                    ignore_conflicts=not table.mapped,
+                )
+
+        if table.mapped:
+            created = new_ids(model, after, len(rows))
+            self.ids.add(table.name, zip((row["id"] for row in rows), created))
+
+        state = {"line": state["line"] + len(batch), "pending": None, "done": False}
+        self.checkpoint.save(table.name, state)
+        return state
+
+    def remap(self, table, rows):
+        for attname, target in table.remap.items():
+            ids = self.ids.get(target, [row[attname] for row in rows])
+            kept = []
+            for row in rows:
+                if row[attname] in ids:
+                    row[attname] = ids[row[attname]]
+                    kept.append(row)
+            self.skipped += len(rows) - len(kept)
+            rows = kept
+        return rows
+
+    def merge(self, table, rows):
+        # Rows already in this database, say an existing user, are reused
+        # rather than inserted.
+        key = table.natural_key
+        existing = dict(
+            table.model.objects.filter(
+                **{key + "__in": [row[key] for row in rows]}
+            ).values_list(key, "id")
+        )
+        self.ids.add(
+            table.name,
+            ((row["id"], existing[row[key]]) for row in rows if row[key] in existing),
+        )
+        return [row for row in rows if row[key] not in existing]
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from questions.models import Tag
+
+
+class Command(BaseCommand):
+    help = "This command lowercases tag titles and merges tags that only differ in case"
+
+    def handle(self, *args, **options):
+        removed = Tag.objects.merge_case_duplicates()
+        self.stdout.write("Merged %i duplicate tags" % removed)
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from questions.models import (
+    REPUTATION_POINTS,
+    Answer,
+    AnswerDislikes,
+    AnswerLikes,
+    QuestionDislikes,
+    QuestionLikes,
+    ReputationEvent,
+    User,
+)
+from questions.reputation import rebuild_leaderboard
+
+
+def votes(model, fk):
+    # votes on one's own posts earn nothing
+    return model.objects.exclude(user=F(fk + "__author")).values_list(
+        "user_id", fk + "_id", fk + "__author_id"
+    )
+
+
+class Command(BaseCommand):
+    help = "This command replays the reputation ledger from the vote tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # (rows as (actor, target id, recipient), target foreign key, kind)
+        sources = [
+            (votes(QuestionLikes, "question"), "question_id", "question_like"),
+            (votes(QuestionDislikes, "question"), "question_id", "question_dislike"),
+            (votes(AnswerLikes, "answer"), "answer_id", "answer_like"),
+            (votes(AnswerDislikes, "answer"), "answer_id", "answer_dislike"),
+            # and neither does accepting one's own answer
+            (
+                Answer.objects.filter(is_correct=True)
+                .exclude(author=F("question__author"))
+                .values_list("question__author_id", "id", "author_id"),
+                "answer_id",
+                "answer_correct",
+            ),
+        ]
+
+        total = 0
+        with transaction.atomic():
+            # Events of deleted posts cannot be replayed and are kept as they
+            # are, like the points they gave.
+            ReputationEvent.objects.exclude(question=None, answer=None).delete()
+            for rows, target, kind in sources:
+                batch = []
+                for actor, pk, recipient in rows.order_by().iterator():
+                    batch.append(
+                        ReputationEvent(
+                            user_id=recipient,
+                            actor_id=actor,
+                            kind=kind,
+                            points=REPUTATION_POINTS[kind],
+                            **{target: pk},
+                        )
+                    )
+                    if len(batch) >= options["batch_size"]:
+                        total += self.flush(batch)
+                        batch = []
+                total += self.flush(batch)
+
+            points = (
+                ReputationEvent.objects.filter(user_id=OuterRef("pk"))
+                .order_by()
+                .values("user_id")
+                .annotate(total=Sum("points"))
+                .values("total")
+            )
+            User.objects.update(
+                reputation=Coalesce(Subquery(points, output_field=IntegerField()), 0)
+            )
+
+        transaction.on_commit(rebuild_leaderboard)
+        self.stdout.write("Replayed %i reputation events" % total)
+
+    def flush(self, batch):
+        ReputationEvent.objects.bulk_create(batch)
+        return len(batch)
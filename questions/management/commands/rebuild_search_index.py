@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from questions.search import search_backend
+
+
+class Command(BaseCommand):
+    help = "This command rebuilds the full-text search index from scratch"
+
+    def handle(self, *args, **options):
+        search_backend().rebuild()
+        self.stdout.write("Search index rebuilt")
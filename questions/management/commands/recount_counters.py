@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from questions.models import (
+    Question,
+    QuestionLikes,
+    QuestionDislikes,
+    Answer,
+    AnswerLikes,
+    AnswerDislikes,
+    Tag,
+    TaggedQuestion,
+    count_of,
+)
+
+
+class Command(BaseCommand):
+    help = "This command recomputes stored like/dislike/answer counters"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            questions = Question.objects.update(
+                likes_count=count_of(QuestionLikes, "question"),
+                dislikes_count=count_of(QuestionDislikes, "question"),
+                answers_count=count_of(Answer, "question"),
+            )
+            Question.objects.update(rating=F("likes_count") - F("dislikes_count"))
+
+            answers = Answer.objects.update(
+                likes_count=count_of(AnswerLikes, "answer"),
+                dislikes_count=count_of(AnswerDislikes, "answer"),
+            )
+            Answer.objects.update(rating=F("likes_count") - F("dislikes_count"))
+
+            Tag.objects.update(questions_count=count_of(TaggedQuestion, "tag"))
+
+            TaggedQuestion.objects.update(
+                create_date=Subquery(
+                    Question.objects.filter(pk=OuterRef("question_id")).values(
+                        "create_date"
+                    )[:1]
+                )
+            )
+
+        self.stdout.write(
+            "Recounted %i questions and %i answers" % (questions, answers)
+        )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from questions.sidebar import refresh_sidebar
+
+
+class Command(BaseCommand):
+    help = "This command precomputes the cached popular tags and best users"
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "SHARED_CACHE", False):
+            self.stderr.write(
+                "The cache is private to this process, so the web workers will "
+                "not see this sidebar; set CACHE_URL to memcached:// or redis://"
+            )
+        data = refresh_sidebar()
+        self.stdout.write(
+            "Cached %i trending tags, %i popular tags and %i users"
+            % (len(data["tags"]["week"]), len(data["tags"]["all"]), len(data["users"]))
+        )
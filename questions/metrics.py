@@ -0,0 +1,86 @@
+import bisect
+import threading
+from collections import defaultdict
+
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, q):
+        # Linear interpolation inside the bucket holding the q-th sample.
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = defaultdict(int)
+
+    def observe(self, metric, view, value, buckets=TIME_BUCKETS):
+        with self.lock:
+            key = (metric, view)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def inc(self, metric, view, amount=1):
+        with self.lock:
+            self.counters[(metric, view)] += amount
+
+    def export(self, qs=(0.5, 0.95, 0.99)):
+        lines = []
+        with self.lock:
+            for (metric, view), h in sorted(self.histograms.items()):
+                label = 'view="%s"' % view
+                for bound, n in zip(h.buckets, self._cumulative(h.counts)):
+                    lines.append('%s_bucket{%s,le="%s"} %i' % (metric, label, bound, n))
+                lines.append('%s_bucket{%s,le="+Inf"} %i' % (metric, label, h.count))
+                lines.append("%s_sum{%s} %s" % (metric, label, h.sum))
+                lines.append("%s_count{%s} %i" % (metric, label, h.count))
+                for q in qs:
+                    lines.append(
+                        '%s_quantile{%s,quantile="%s"} %s'
+                        % (metric, label, q, h.percentile(q))
+                    )
+            for (metric, view), n in sorted(self.counters.items()):
+                lines.append('%s{view="%s"} %i' % (metric, view, n))
+        return "\n".join(lines) + "\n"
+
+    def _cumulative(self, counts):
+        total = 0
+        for n in counts:
+            total += n
+            yield total
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+registry = Registry()
@@ -0,0 +1,309 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.template.backends import django as django_backend
+from .metrics import COUNT_BUCKETS, registry
+from .routers import read_from_replica
+from .staticfiles import ENCODINGS, find_files
+
+logger = logging.getLogger(__name__)
+
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.sql_time = 0
+        self.template_time = 0
+        self.statements = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            # async views run queries for one request on several threads
+            with self.lock:
+                self.sql_time += time.perf_counter() - started
+                self.queries += 1
+                self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+def timed_execute(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install_timed_execute(sender, connection, **kwargs):
+    # Installed once per connection rather than per request, so queries are
+    # attributed through the context variable on whichever thread runs them.
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+class HybridMiddleware:
+    """
+    Base for middleware with native sync and async paths, so async views
+    under ASGI are not funnelled through Django's single sync thread.
+    Subclasses implement ``__call__`` and ``__acall__``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = asyncio.iscoroutinefunction(get_response)
+        if self.async_mode:
+            # How Django recognises a coroutine-function instance (as in
+            # MiddlewareMixin).
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+def timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timings.template_time += time.perf_counter() - started
+
+    wrapper.timed = True
+    return wrapper
+
+
+class PerformanceMiddleware(HybridMiddleware):
+    """
+    Records wall time, query count, SQL time, duplicate queries and
+    template render time per URL name, adds a Server-Timing header and
+    feeds the histograms exported by the ``metrics`` view.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERFORMANCE_METRICS", True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+        template = django_backend.Template
+        if not getattr(template.render, "timed", False):
+            template.render = timed_render(template.render)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unknown"
+        self.record(view, total, timings)
+
+        response["Server-Timing"] = (
+            'db;dur=%.1f;desc="%i queries", tpl;dur=%.1f, total;dur=%.1f'
+            % (
+                timings.sql_time * 1000,
+                timings.queries,
+                timings.template_time * 1000,
+                total * 1000,
+            )
+        )
+        return response
+
+    def record(self, view, total, timings):
+        registry.observe("questions_request_duration_seconds", view, total)
+        registry.observe("questions_sql_duration_seconds", view, timings.sql_time)
+        registry.observe(
+            "questions_template_duration_seconds", view, timings.template_time
+        )
+        registry.observe("questions_queries", view, timings.queries, COUNT_BUCKETS)
+        registry.inc("questions_requests_total", view)
+        if timings.duplicates:
+            registry.inc("questions_duplicate_queries_total", view, timings.duplicates)
+            logger.warning("%s ran %i duplicate queries", view, timings.duplicates)
+
+
+class ReplicaStickinessMiddleware(HybridMiddleware):
+    """
+    Lets safe requests read from the replica, except for a short window
+    after the same client sent a write, so it always sees its own writes.
+    """
+
+    cookie_name = "primary_db"
+
+    def __init__(self, get_response):
+        if "replica" not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = read_from_replica.set(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.stick(request, response)
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.stick(request, response)
+
+    def safe(self, request):
+        return request.method in ("GET", "HEAD", "OPTIONS")
+
+    def use_replica(self, request):
+        return self.safe(request) and self.cookie_name not in request.COOKIES
+
+    def stick(self, request, response):
+        if not self.safe(request):
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 10),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class StaticFile:
+    def __init__(self, path, cache_control):
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cache_control = cache_control
+        with open(path, "rb") as f:
+            digest = hashlib.md5(f.read()).hexdigest()[:16]
+
+        # encoding -> (path, size, etag); None is the uncompressed file
+        self.variants = {None: (path, os.path.getsize(path), '"%s"' % digest)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                self.variants[encoding] = (
+                    path + suffix,
+                    os.path.getsize(path + suffix),
+                    '"%s-%s"' % (digest, encoding),
+                )
+
+    def choose(self, accept_encoding):
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def respond(self, request):
+        encoding = self.choose(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        path, size, etag = self.variants[encoding]
+
+        if etag in request.META.get("HTTP_IF_NONE_MATCH", ""):
+            response = HttpResponseNotModified()
+        elif request.method == "HEAD":
+            response = HttpResponse(content_type=self.content_type)
+            response["Content-Length"] = size
+        else:
+            response = FileResponse(open(path, "rb"), content_type=self.content_type)
+            # would name the .gz/.br file rather than the asset
+            del response["Content-Disposition"]
+
+        response["ETag"] = etag
+        response["Cache-Control"] = self.cache_control
+        if len(self.variants) > 1:
+            response["Vary"] = "Accept-Encoding"
+        if encoding and response.status_code == 200:
+            response["Content-Encoding"] = encoding
+        return response
+
+
+class StaticFilesMiddleware(HybridMiddleware):
+    """
+    Serves the output of collectstatic from STATIC_ROOT before the rest of
+    the stack runs. Content-hashed names are cached for a year as
+    immutable, and precompressed .br/.gz copies are picked by
+    Accept-Encoding.
+    """
+
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if not getattr(settings, "SERVE_STATIC", True) or not root:
+            raise MiddlewareNotUsed
+        if not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+        immutable = set()
+        if hasattr(staticfiles_storage, "immutable_names"):
+            immutable = staticfiles_storage.immutable_names()
+        max_age = getattr(settings, "STATIC_MAX_AGE", 60)
+
+        self.files = {}
+        for name, path in find_files(root):
+            if name.endswith((".br", ".gz")) or name == "staticfiles.json":
+                continue
+            if name in immutable:
+                cache_control = "public, max-age=31536000, immutable"
+            else:
+                cache_control = "public, max-age=%i" % max_age
+            self.files[settings.STATIC_URL + name] = StaticFile(path, cache_control)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        static = self.find(request)
+        if static is None:
+            return self.get_response(request)
+        return static.respond(request)
+
+    async def __acall__(self, request):
+        static = self.find(request)
+        if static is None:
+            return await self.get_response(request)
+        return static.respond(request)
+
+    def find(self, request):
+        if request.method in ("GET", "HEAD"):
+            return self.files.get(request.path)
+        return None
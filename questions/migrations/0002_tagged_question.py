@@ -0,0 +1,119 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_create_date(apps, schema_editor):
+    Question = apps.get_model("questions", "Question")
+    TaggedQuestion = apps.get_model("questions", "TaggedQuestion")
+    TaggedQuestion.objects.update(
+        create_date=Subquery(
+            Question.objects.filter(pk=OuterRef("question_id")).values(
+                "create_date"
+            )[:1]
+        )
+    )
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    # Titles that only differ in case or surrounding spaces become one
+    # lowercase tag before the unique index is built.
+    Tag = apps.get_model("questions", "Tag")
+    TaggedQuestion = apps.get_model("questions", "TaggedQuestion")
+
+    groups = {}
+    for pk, title in Tag.objects.order_by("id").values_list("id", "title"):
+        groups.setdefault(title.strip().lower()[:50], []).append((pk, title))
+
+    for name, tags in groups.items():
+        if len(tags) == 1 and tags[0][1] == name:
+            continue
+        keep = next((pk for pk, title in tags if title == name), tags[0][0])
+        kept = TaggedQuestion.objects.filter(tag_id=keep)
+        for pk, _ in tags:
+            if pk == keep:
+                continue
+            tagged = TaggedQuestion.objects.filter(tag_id=pk)
+            tagged.filter(question_id__in=kept.values("question_id")).delete()
+            tagged.update(tag_id=keep)
+            Tag.objects.filter(id=pk).delete()
+        Tag.objects.filter(id=keep).update(title=name)
+
+
+class Migration(migrations.Migration):
+    """
+    Turns the automatic question/tag table into the TaggedQuestion model. It
+    keeps the table and its unique (question, tag) index, adds the copied
+    question date and the tag listing index, then merges duplicate tags so
+    Tag.title can be unique.
+    """
+
+    dependencies = [
+        ("questions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="TaggedQuestion",
+                    fields=[
+                        (
+                            "id",
+                            models.AutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "question",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="questions.question",
+                            ),
+                        ),
+                        (
+                            "tag",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="questions.tag",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "questions_question_tags",
+                        "unique_together": {("question", "tag")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="question",
+                    name="tags",
+                    field=models.ManyToManyField(
+                        through="questions.TaggedQuestion", to="questions.Tag"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="taggedquestion",
+            name="create_date",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_create_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="taggedquestion",
+            index=models.Index(
+                fields=["tag", "-create_date", "-question"],
+                name="questions_q_tag_id_d11f15_idx",
+            ),
+        ),
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="tag",
+            name="title",
+            field=models.CharField(max_length=50, unique=True, verbose_name="Tag"),
+        ),
+    ]
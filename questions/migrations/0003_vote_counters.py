@@ -0,0 +1,85 @@
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, fk):
+    rows = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount(apps, schema_editor):
+    Question = apps.get_model("questions", "Question")
+    Answer = apps.get_model("questions", "Answer")
+    QuestionLikes = apps.get_model("questions", "QuestionLikes")
+    QuestionDislikes = apps.get_model("questions", "QuestionDislikes")
+    AnswerLikes = apps.get_model("questions", "AnswerLikes")
+    AnswerDislikes = apps.get_model("questions", "AnswerDislikes")
+
+    Question.objects.update(
+        likes_count=count_of(QuestionLikes, "question"),
+        dislikes_count=count_of(QuestionDislikes, "question"),
+        answers_count=count_of(Answer, "question"),
+    )
+    Question.objects.update(rating=F("likes_count") - F("dislikes_count"))
+    Answer.objects.update(
+        likes_count=count_of(AnswerLikes, "answer"),
+        dislikes_count=count_of(AnswerDislikes, "answer"),
+    )
+    Answer.objects.update(rating=F("likes_count") - F("dislikes_count"))
+
+
+class Migration(migrations.Migration):
+    """
+    Stored like, dislike, answer and rating counters on questions and
+    answers, counted from the existing rows.
+    """
+
+    dependencies = [
+        ("questions", "0002_tagged_question"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="dislikes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="answers_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="rating",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="dislikes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="rating",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
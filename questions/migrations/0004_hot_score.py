@@ -0,0 +1,56 @@
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+# questions.models.HOT_GRAVITY when this migration was written
+HOT_GRAVITY = 1.8
+
+
+def decay(apps, schema_editor):
+    Question = apps.get_model("questions", "Question")
+    now = timezone.now()
+    rows = Question.objects.order_by().values_list(
+        "id", "rating", "answers_count", "create_date"
+    )
+    batch = []
+    for pk, rating, answers, create_date in rows.iterator():
+        hours = max((now - create_date).total_seconds(), 0) / 3600
+        score = (rating + answers + 1) / (hours + 2) ** HOT_GRAVITY
+        batch.append(Question(id=pk, hot_score=score))
+        if len(batch) >= 1000:
+            Question.objects.bulk_update(batch, ["hot_score"])
+            batch = []
+    Question.objects.bulk_update(batch, ["hot_score"])
+
+
+class Migration(migrations.Migration):
+    """
+    Stored, time-decayed hot score of questions for the hot listing, scored
+    from the counters of 0003.
+    """
+
+    dependencies = [
+        ("questions", "0003_vote_counters"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="question",
+            name="create_date",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Creation time"
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="hot_score",
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(decay, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["-hot_score", "-id"], name="questions_q_hot_sco_5d0f8f_idx"
+            ),
+        ),
+    ]
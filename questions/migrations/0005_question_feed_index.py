@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index for keyset pagination of the newest questions."""
+
+    dependencies = [
+        ("questions", "0004_hot_score"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["-create_date", "-id"], name="questions_q_create__65821f_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import questions.avatars
+
+
+class Migration(migrations.Migration):
+    """
+    Content-hashed avatar uploads and the thumbnails flag. Existing avatars
+    keep serving their original until ``build_avatars`` has processed them.
+    """
+
+    dependencies = [
+        ("questions", "0005_question_feed_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="upload",
+            field=models.ImageField(
+                default="uploads/default_image.jpg",
+                upload_to=questions.avatars.avatar_upload_to,
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="thumbnails_ready",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def keep_one_accepted_answer(apps, schema_editor):
+    # Before accepting was limited to one answer per question, several could
+    # be flagged; the oldest one stays accepted.
+    Answer = apps.get_model("questions", "Answer")
+    firsts = (
+        Answer.objects.filter(is_correct=True)
+        .order_by()
+        .values("question_id")
+        .annotate(first=Min("id"))
+        .values("first")
+    )
+    Answer.objects.filter(is_correct=True).exclude(id__in=firsts).update(
+        is_correct=False
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    At most one accepted answer per question, and the index answers are
+    listed by: accepted first, then by rating.
+    """
+
+    dependencies = [
+        ("questions", "0006_avatar_thumbnails"),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_one_accepted_answer, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="answer",
+            index=models.Index(
+                fields=["question", "-is_correct", "-rating", "id"],
+                name="questions_a_questio_fb22fa_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="answer",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_correct", True)),
+                fields=("question",),
+                name="one_correct_answer_per_question",
+            ),
+        ),
+    ]
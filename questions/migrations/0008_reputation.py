@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+import django.utils.timezone
+
+# questions.models.REPUTATION_POINTS when this migration was written
+REPUTATION_POINTS = {
+    "question_like": 5,
+    "question_dislike": -2,
+    "answer_like": 10,
+    "answer_dislike": -2,
+    "answer_correct": 15,
+}
+
+
+def replay(apps, schema_editor):
+    # Same as the rebuild_reputation command, against the historical models.
+    def get(name):
+        return apps.get_model("questions", name)
+
+    ReputationEvent = get("ReputationEvent")
+    User = get("User")
+
+    def votes(model, fk):
+        # votes on one's own posts earn nothing
+        return get(model).objects.exclude(user=F(fk + "__author")).values_list(
+            "user_id", fk + "_id", fk + "__author_id"
+        )
+
+    sources = [
+        (votes("QuestionLikes", "question"), "question_id", "question_like"),
+        (votes("QuestionDislikes", "question"), "question_id", "question_dislike"),
+        (votes("AnswerLikes", "answer"), "answer_id", "answer_like"),
+        (votes("AnswerDislikes", "answer"), "answer_id", "answer_dislike"),
+        (
+            get("Answer")
+            .objects.filter(is_correct=True)
+            .exclude(author=F("question__author"))
+            .values_list("question__author_id", "id", "author_id"),
+            "answer_id",
+            "answer_correct",
+        ),
+    ]
+    for rows, target, kind in sources:
+        ReputationEvent.objects.bulk_create(
+            (
+                ReputationEvent(
+                    user_id=recipient,
+                    actor_id=actor,
+                    kind=kind,
+                    points=REPUTATION_POINTS[kind],
+                    **{target: pk},
+                )
+                for actor, pk, recipient in rows.order_by().iterator()
+            ),
+            batch_size=1000,
+        )
+
+    points = (
+        ReputationEvent.objects.filter(user_id=OuterRef("pk"))
+        .order_by()
+        .values("user_id")
+        .annotate(total=Sum("points"))
+        .values("total")
+    )
+    User.objects.update(
+        reputation=Coalesce(Subquery(points, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    The reputation ledger and the stored per-user total, replayed from the
+    existing votes and accepted answers.
+    """
+
+    dependencies = [
+        ("questions", "0007_accepted_answer"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReputationEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("question_like", "Question liked"),
+                            ("question_dislike", "Question disliked"),
+                            ("answer_like", "Answer liked"),
+                            ("answer_dislike", "Answer disliked"),
+                            ("answer_correct", "Answer marked correct"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("points", models.IntegerField()),
+                (
+                    "create_date",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "answer",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="questions.answer",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="questions.question",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-create_date"],
+                        name="questions_r_user_id_f68e1d_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="reputation",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(replay, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["-reputation", "id"], name="questions_u_reputat_666ec8_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,124 @@
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    # Counts every tag's questions, and buckets the recent ones the way
+    # compact_tag_activity keeps them: hourly within the hourly retention,
+    # daily before that, nothing past the daily retention. Buckets start on
+    # UTC hours and days, like those compaction writes.
+    Tag = apps.get_model("questions", "Tag")
+    TaggedQuestion = apps.get_model("questions", "TaggedQuestion")
+    TagActivity = apps.get_model("questions", "TagActivity")
+
+    counts = (
+        TaggedQuestion.objects.filter(tag_id=OuterRef("pk"))
+        .order_by()
+        .values("tag_id")
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    Tag.objects.update(
+        questions_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+    now = timezone.now()
+    hourly = now - timedelta(
+        hours=getattr(settings, "TRENDING_HOURLY_RETENTION_HOURS", 48)
+    )
+    daily = now - timedelta(days=getattr(settings, "TRENDING_DAILY_RETENTION_DAYS", 90))
+    for resolution, trunc, rows in (
+        ("h", TruncHour, TaggedQuestion.objects.filter(create_date__gte=hourly)),
+        (
+            "d",
+            TruncDay,
+            TaggedQuestion.objects.filter(
+                create_date__gte=daily, create_date__lt=hourly
+            ),
+        ),
+    ):
+        rows = (
+            rows.annotate(start=trunc("create_date", tzinfo=dt_timezone.utc))
+            .values("tag_id", "start")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        TagActivity.objects.bulk_create(
+            (
+                TagActivity(
+                    tag_id=row["tag_id"],
+                    resolution=resolution,
+                    start=row["start"],
+                    count=row["n"],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Stored per-tag question counts and the time-bucketed tag activity behind
+    the trending tags, both filled from the existing tagged questions.
+    """
+
+    dependencies = [
+        ("questions", "0008_reputation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tag",
+            name="questions_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="TagActivity",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("h", "hour"), ("d", "day")], max_length=1
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="questions.tag",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["start"], name="questions_t_start_d510c8_idx")
+                ],
+                "unique_together": {("tag", "resolution", "start")},
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["-questions_count", "id"], name="questions_t_questio_2ff4ea_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0009_tag_activity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reputationevent',
+            name='answer',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='questions.answer'),
+        ),
+        migrations.AlterField(
+            model_name='reputationevent',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='questions.question'),
+        ),
+    ]
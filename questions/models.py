@@ -1,24 +1,147 @@
 # coding=utf-8
 from __future__ import unicode_literals
-from datetime import datetime
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
-from django.db.models import Count
+from django.db import connection, models, transaction
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .avatars import avatar_sizes, avatar_upload_to, schedule_avatar, thumbnail_name
+from .search import search_backend
+from .signals import question_created, answer_created, answer_accepted, vote_cast
 
 
-import random, string
+import re
 
-def randomword(length):
-   letters = string.ascii_lowercase
-   return ''.join(random.choice(letters) for i in range(length))
+
+HOT_GRAVITY = 1.8
+
+ANSWERS_PER_PAGE = 4
+
+REPUTATION_POINTS = {
+    "question_like": 5,
+    "question_dislike": -2,
+    "answer_like": 10,
+    "answer_dislike": -2,
+    "answer_correct": 15,
+}
+
+
+def hot_score(rating, answers, create_date, now=None):
+    now = now or timezone.now()
+    hours = max((now - create_date).total_seconds(), 0) / 3600
+    return (rating + answers + 1) / (hours + 2) ** HOT_GRAVITY
+
+
+def count_of(model, fk):
+    rows = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+class CounterManager(models.Manager):
+    def vote_models(self):
+        # (like model, dislike model, foreign key to this model)
+        raise NotImplementedError
+
+    def bump_counters(self, pk, counter, delta, rating=0):
+        changes = {counter: F(counter) + delta}
+        if rating:
+            changes["rating"] = F("rating") + rating * delta
+        self.filter(pk=pk).update(**changes)
+
+    def recount_votes(self, pk):
+        likes, dislikes, fk = self.vote_models()
+        self.filter(pk=pk).update(
+            likes_count=count_of(likes, fk),
+            dislikes_count=count_of(dislikes, fk),
+            rating=count_of(likes, fk) - count_of(dislikes, fk),
+        )
+
+    def lock_row(self, pk):
+        """
+        Lock row ``pk`` for the rest of the transaction; raises DoesNotExist
+        if it is gone. Call it before anything else in the transaction.
+        """
+        rows = self.filter(pk=pk)
+        if connection.features.has_select_for_update:
+            rows.select_for_update().values_list("pk").get()
+        # SQLite has no row locks, and a transaction that reads first cannot
+        # upgrade to writing while another one reads: it fails with "database
+        # is locked" without waiting. A write first takes the database write
+        # lock, which waits out the busy timeout instead.
+        elif not rows.update(id=F("id")):
+            raise self.model.DoesNotExist
+
+    def vote(self, pk, user, like):
+        likes, dislikes, fk = self.vote_models()
+        same, opposite = (likes, dislikes) if like else (dislikes, likes)
+        lookup = {fk + "_id": pk, "user": user}
+
+        sign = 1 if like else -1
+
+        with transaction.atomic():
+            # Locking the voted row serializes votes on it, so a double click
+            # sees the first click's row and ``previous``/``current`` match
+            # what was actually deleted and inserted. The counters are then
+            # recounted from the rows.
+            self.lock_row(pk)
+            previous = -sign if opposite.objects.filter(**lookup).delete()[0] else 0
+            if same.objects.filter(**lookup).delete()[0]:
+                previous, current = sign, 0
+            else:
+                same.objects.bulk_create([same(**lookup)])
+                current = sign
+            self.recount_votes(pk)
+
+            vote_cast.send(
+                sender=self.model, pk=pk, user=user, previous=previous, current=current
+            )
+
+            return self.filter(pk=pk).values(
+                "likes_count", "dislikes_count", "rating"
+            ).get()
+
+
+class CountedModel(models.Model):
+    # (foreign key, counter on the referenced row, rating weight)
+    counted_by = None
+
+    class Meta:
+        abstract = True
+
+    def _bump(self, delta):
+        fk, counter, rating = self.counted_by
+        field = self._meta.get_field(fk)
+        field.related_model.objects.bump_counters(
+            getattr(self, field.attname), counter, delta, rating
+        )
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if adding:
+                self._bump(1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            result = super().delete(*args, **kwargs)
+            self._bump(-1)
+        return result
 
 
 class UserManager(UserManager):
     def all_users(self):
         return self.all()
 
-    def best_users(self):
-        return self.annotate(num_users=Count("answerlikes")).order_by("-num_users")[:10]
+    def best_users(self, limit=10):
+        return self.order_by("-reputation", "id")[:limit]
 
     def create_user(self, login, email, nickname, password=None, photo=None):
         if not login:
@@ -28,6 +151,7 @@ class UserManager(UserManager):
 
         user.set_password(password)
         user.save(using=self._db)
+        schedule_avatar(user)
         return user
 
     def edit_user(self, user, login=None, email=None, nickname=None, photo=None):
@@ -38,8 +162,11 @@ class UserManager(UserManager):
             user.nickname = nickname
         if photo:
             user.upload = photo
+            user.thumbnails_ready = False
 
         user.save()
+        if photo:
+            schedule_avatar(user)
 
         return user
 
@@ -47,20 +174,50 @@ class UserManager(UserManager):
 class User(AbstractUser):
     objects = UserManager()
     upload = models.ImageField(
-        upload_to="uploads/" + randomword(10), default="uploads/default_image.jpg"
+        upload_to=avatar_upload_to, default="uploads/default_image.jpg"
     )
+    thumbnails_ready = models.BooleanField(default=False)
     nickname = models.CharField(max_length=100)
+    # Sum of the user's ReputationEvent points, kept up to date on write
+    reputation = models.IntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["-reputation", "id"])]
+
+    def avatar_url(self, size, fmt="jpeg"):
+        if not self.thumbnails_ready:
+            return self.upload.url
+        return self.upload.storage.url(thumbnail_name(self.upload.name, size, fmt))
+
+    @property
+    def avatar(self):
+        return self.avatar_url(max(avatar_sizes()))
+
+    @property
+    def avatar_webp(self):
+        return self.avatar_url(max(avatar_sizes()), "webp")
+
+    @property
+    def avatar_small(self):
+        return self.avatar_url(min(avatar_sizes()))
+
+    @property
+    def avatar_small_webp(self):
+        return self.avatar_url(min(avatar_sizes()), "webp")
 
 
 class TagManager(models.Manager):
     def all_tags(self):
         return self.all()
 
-    def best_tags(self):
-        return self.annotate(num_tags=Count("question")).order_by("-num_tags")[:10]
+    def best_tags(self, limit=10):
+        return self.order_by("-questions_count", "id")[:limit]
+
+    def trending_tags(self, since, limit=10):
+        return TagActivity.objects.trending(since, limit)
 
     def get_tag_by_name(self, name):
-        return self.get(title=name)
+        return self.get(title=self.normalize(name))
 
     def create_tag(self, title):
         tag = self.model(title=title)
@@ -69,123 +226,293 @@ class TagManager(models.Manager):
 
         return tag
 
+    def normalize(self, name):
+        max_length = self.model._meta.get_field("title").max_length
+        return name.strip().lower()[:max_length]
+
+    def parse(self, tags):
+        names = []
+        for name in re.split(r"[,\s]+", tags):
+            name = self.normalize(name)
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def get_or_create_tags(self, names):
+        if not names:
+            return []
+
+        found = list(self.filter(title__in=names))
+        missing = set(names) - {tag.title for tag in found}
+        if missing:
+            self.bulk_create(
+                [self.model(title=name) for name in missing], ignore_conflicts=True
+            )
+            found += self.filter(title__in=missing)
+        return found
+
+    def merge_case_duplicates(self):
+        """
+        Fold tags whose titles only differ in case, left from before titles
+        were lowercased, into one lowercase tag. Returns the number of tags
+        removed.
+        """
+        groups = {}
+        for pk, title in self.order_by("id").values_list("id", "title"):
+            groups.setdefault(self.normalize(title), []).append((pk, title))
+
+        removed = 0
+        with transaction.atomic():
+            for name, tags in groups.items():
+                if len(tags) == 1 and tags[0][1] == name:
+                    continue
+                # keep the tag already spelled in lowercase, else the oldest
+                keep = next((pk for pk, title in tags if title == name), tags[0][0])
+                others = [pk for pk, _ in tags if pk != keep]
+
+                kept = TaggedQuestion.objects.filter(tag_id=keep)
+                for pk in others:
+                    tagged = TaggedQuestion.objects.filter(tag_id=pk)
+                    tagged.filter(question_id__in=kept.values("question_id")).delete()
+                    tagged.update(tag_id=keep)
+                # tag activity is rebuilt by compact_tag_activity --rebuild
+                TagActivity.objects.filter(tag_id__in=others).delete()
+                self.filter(id__in=others).delete()
+                self.filter(id=keep).update(
+                    title=name, questions_count=count_of(TaggedQuestion, "tag")
+                )
+                removed += len(others)
+        return removed
+
 
 class Tag(models.Model):
     objects = TagManager()
-    title = models.CharField(max_length=50, verbose_name="Tag")
+    title = models.CharField(max_length=50, unique=True, verbose_name="Tag")
+    questions_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["-questions_count", "id"])]
 
     def __str__(self):
         return self.title
 
 
-class QuestionManager(models.Manager):
+class TagActivityManager(models.Manager):
+    def record(self, tag_ids, when):
+        bucket = when.replace(minute=0, second=0, microsecond=0)
+        self.bulk_create(
+            [
+                self.model(tag_id=pk, resolution=self.model.HOUR, start=bucket)
+                for pk in tag_ids
+            ],
+            ignore_conflicts=True,
+        )
+        self.filter(
+            tag_id__in=tag_ids, resolution=self.model.HOUR, start=bucket
+        ).update(count=F("count") + 1)
+
+    def trending(self, since, limit=10):
+        # Hourly buckets are matched exactly and daily ones by their start,
+        # so the window is only rounded to whole days where it reaches past
+        # the hourly retention.
+        day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        return (
+            self.filter(start__gte=day)
+            .filter(Q(resolution=self.model.DAY) | Q(start__gte=since))
+            .values(title=F("tag__title"))
+            .annotate(total=Sum("count"))
+            .order_by("-total", "title")[:limit]
+        )
+
+    def compact(self, now, hourly_retention, daily_retention):
+        """
+        Fold hourly buckets older than ``hourly_retention`` into daily ones
+        and drop daily buckets older than ``daily_retention``.
+        """
+        old = self.filter(resolution=self.model.HOUR, start__lt=now - hourly_retention)
+        days = {}
+        for tag_id, start, count in old.values_list("tag_id", "start", "count"):
+            key = (tag_id, start.replace(hour=0))
+            days[key] = days.get(key, 0) + count
+
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(tag_id=tag_id, resolution=self.model.DAY, start=day)
+                    for tag_id, day in days
+                ],
+                ignore_conflicts=True,
+            )
+            for (tag_id, day), count in days.items():
+                self.filter(tag_id=tag_id, resolution=self.model.DAY, start=day).update(
+                    count=F("count") + count
+                )
+            folded = old.delete()[0]
+            dropped = self.filter(
+                resolution=self.model.DAY, start__lt=now - daily_retention
+            ).delete()[0]
+        return folded, dropped
+
+
+class TagActivity(models.Model):
+    """
+    Questions tagged per tag and time bucket, for "trending" lists. New
+    questions land in hourly buckets which compaction later folds into
+    daily ones.
+    """
+
+    HOUR = "h"
+    DAY = "d"
+
+    objects = TagActivityManager()
+
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    resolution = models.CharField(max_length=1, choices=[(HOUR, "hour"), (DAY, "day")])
+    start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (("tag", "resolution", "start"),)
+        indexes = [models.Index(fields=["start"])]
+
+
+class QuestionManager(CounterManager):
     def get_absolute_url(self, id):
         return "/question/%i/" % id
 
     def all_questions(self):
         return self.all()
 
+    def feed(self):
+        return self.select_related("author").prefetch_related("tags")
+
     def get_question_by_id(self, id):
-        return self.annotate(
-            num_likes=Count("questionlikes", distinct=True),
-            num_dislikes=Count("questiondislikes", distinct=True),
-        ).get(id=id)
+        return self.feed().get(id=id)
 
     def get_questions_by_tag(self, tagname):
-        tag = Tag.objects.get(title=tagname)
-        result = self.filter(tags=tag).annotate(
-            num_likes=Count("questionlikes", distinct=True),
-            num_dislikes=Count("questiondislikes", distinct=True),
-            num_answers=Count("answer", distinct=True),
-        )
-
-        return result
+        tag = Tag.objects.get_tag_by_name(tagname)
+        return self.feed().filter(tags=tag)
 
     def get_question_by_popular(self):
-        return (
-            self.all()
-            .annotate(
-                num_likes=Count("questionlikes", distinct=True),
-                num_dislikes=Count("questiondislikes", distinct=True),
-                num_answers=Count("answer", distinct=True),
-            )
-            .order_by("-num_likes")[:10]
-        )
+        return self.feed().order_by("-hot_score", "-id")
 
     def get_question_by_date(self):
-        return (
-            self.all()
-            .annotate(
-                num_likes=Count("questionlikes", distinct=True),
-                num_dislikes=Count("questiondislikes", distinct=True),
-                num_answers=Count("answer", distinct=True),
-            )
-            .order_by("-create_date")
-        )
+        return self.feed().order_by("-create_date")
+
+    def search(self, query, limit=1000):
+        return search_backend().search(query, limit)
+
+    def get_questions_in_order(self, ids):
+        found = self.feed().in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+    def bump_counters(self, pk, counter, delta, rating=0):
+        super().bump_counters(pk, counter, delta, rating)
+        self.refresh_hot_score(pk)
+
+    def refresh_hot_score(self, pk, now=None):
+        q = self.filter(pk=pk).values("rating", "answers_count", "create_date").first()
+        if q is not None:
+            score = hot_score(q["rating"], q["answers_count"], q["create_date"], now)
+            self.filter(pk=pk).update(hot_score=score)
 
     def create_question(self, author, title, text, tags):
+        now = timezone.now()
         question = self.model(
             author=author,
             title=title,
             text=text,
+            create_date=now,
+            hot_score=hot_score(0, 0, now, now),
         )
 
-        question.save()
+        with transaction.atomic():
+            question.save()
 
-        tag = tags.split(",")
-        tags_for_filter = [tag[i].split(" ") for i in range(len(tag))]
-
-        if tags_for_filter:
-            for t in tags_for_filter:
-                for j in t:
-                    if j != "":
-                        try:
-                            new_tag = Tag.objects.get_tag_by_name(j)
-                        except:
-                            new_tag = Tag.objects.create_tag(j)
+            tags = Tag.objects.get_or_create_tags(Tag.objects.parse(tags))
+            TaggedQuestion.objects.bulk_create(
+                TaggedQuestion(question=question, tag=tag, create_date=now)
+                for tag in tags
+            )
+            if tags:
+                tag_ids = [tag.id for tag in tags]
+                Tag.objects.filter(id__in=tag_ids).update(
+                    questions_count=F("questions_count") + 1
+                )
+                TagActivity.objects.record(tag_ids, now)
 
-                        question.tags.add(new_tag)
+            search_backend().index_question(question)
+            question_created.send(sender=self.model, question=question)
 
         return question
 
-    def like_question(self, answer, user):
-        l = QuestionLikes.model(
-            answer=answer,
-            user=user,
-        )
+    def vote_models(self):
+        return QuestionLikes, QuestionDislikes, "question"
 
-        l.save()
+    def recount_votes(self, pk):
+        super().recount_votes(pk)
+        self.refresh_hot_score(pk)
 
-    def dislike_question(self, answer, user):
-        l = QuestionLikes.model(
-            answer=answer,
-            user=user,
-        )
+    def like_question(self, question, user):
+        return self.vote(question.id, user, like=True)
 
-        l.save()
+    def dislike_question(self, question, user):
+        return self.vote(question.id, user, like=False)
 
 
 class Question(models.Model):
     objects = QuestionManager()
 
     author = models.ForeignKey(User, on_delete=models.CASCADE)
-    tags = models.ManyToManyField(Tag)
+    tags = models.ManyToManyField(Tag, through="TaggedQuestion")
 
     title = models.CharField(max_length=120, verbose_name="Question's header")
     text = models.TextField(verbose_name="Question's metadata")
     create_date = models.DateTimeField(
-        default=datetime.now, verbose_name="Creation time"
+        default=timezone.now, verbose_name="Creation time"
     )
     is_active = models.BooleanField(default=True, verbose_name="Is active")
 
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    answers_count = models.PositiveIntegerField(default=0)
+    rating = models.IntegerField(default=0)
+    hot_score = models.FloatField(default=0)
+
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ["-create_date"]
+        indexes = [
+            models.Index(fields=["-create_date", "-id"]),
+            models.Index(fields=["-hot_score", "-id"]),
+        ]
+
 
+class TaggedQuestionManager(models.Manager):
+    def get_by_tag(self, tagname):
+        tag = Tag.objects.get_tag_by_name(tagname)
+        return self.filter(tag=tag).order_by("-create_date", "-question_id")
+
+
+class TaggedQuestion(models.Model):
+    objects = TaggedQuestionManager()
+
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    # Copy of Question.create_date so tag pages are one index range scan
+    create_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = (("question", "tag"),)
+        db_table = "questions_question_tags"
+        indexes = [models.Index(fields=["tag", "-create_date", "-question"])]
+
+
+class QuestionLikes(CountedModel):
+    counted_by = ("question", "likes_count", 1)
 
-class QuestionLikes(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
@@ -194,7 +521,9 @@ class QuestionLikes(models.Model):
         db_table = 'question_likes'
 
 
-class QuestionDislikes(models.Model):
+class QuestionDislikes(CountedModel):
+    counted_by = ("question", "dislikes_count", -1)
+
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
@@ -203,18 +532,80 @@ class QuestionDislikes(models.Model):
         db_table = 'question_dislikes'
 
 
-class AnswerManager(models.Manager):
+class AnswerManager(CounterManager):
     def all_answers(self):
         return self.all()
 
+    # Accepted answer first, then by score, then oldest first; matches the
+    # (question, -is_correct, -rating, id) index.
+    ordering = ("-is_correct", "-rating", "id")
+
     def get_answers_by_id(self, id):
-        return self.filter(question__id=id).annotate(
-            num_likes=Count("answerlikes", distinct=True),
-            num_dislikes=Count("answerdislikes", distinct=True),
+        answers = self.select_related("author").filter(question_id=id)
+        return answers.order_by(*self.ordering)
+
+    def position(self, answer):
+        """Number of answers listed before ``answer`` on its question."""
+        if answer.is_correct:
+            return 0
+
+        # Counts the answers listed after it instead: for a new answer, at the
+        # end of its rating group, that is a short range of the index however
+        # long the thread is. The total comes from the stored counter.
+        after = Q(rating__lt=answer.rating) | Q(rating=answer.rating, id__gt=answer.id)
+        total = (
+            Question.objects.filter(pk=answer.question_id)
+            .values_list("answers_count", flat=True)
+            .get()
         )
-
-    def get_absolute_url(self, question, answer):
-        return "/question/%i/?page=%i" % (question.id, answer.paginator.num_pages)
+        return total - 1 - self.filter(
+            after, question_id=answer.question_id, is_correct=False
+        ).count()
+
+    def get_absolute_url(self, answer, per_page=ANSWERS_PER_PAGE):
+        page = self.position(answer) // per_page + 1
+        return "/question/%i/?page=%i#answer-%i" % (answer.question_id, page, answer.id)
+
+    def locate(self, pk):
+        answer = self.only("question_id", "is_correct", "rating").get(pk=pk)
+        return self.get_absolute_url(answer)
+
+    def accept(self, pk, user):
+        """
+        Mark answer ``pk`` as the accepted one of its question, or unmark it
+        if it already is. Only the question's author may do so.
+        """
+        with transaction.atomic():
+            # The question is only known once the answer is read, and on
+            # SQLite the lock has to come before any read, see lock_row.
+            self.lock_row(pk)
+            answer = self.get(pk=pk)
+            # Serializes concurrent accepts on the same question.
+            Question.objects.lock_row(answer.question_id)
+            question = Question.objects.only("author_id").get(pk=answer.question_id)
+            if question.author_id != user.id:
+                raise PermissionDenied
+
+            previous = (
+                self.filter(question_id=question.id, is_correct=True)
+                .values_list("id", flat=True)
+                .first()
+            )
+            current = None if previous == answer.id else answer.id
+            if previous:
+                self.filter(pk=previous).update(is_correct=False)
+            if current:
+                self.filter(pk=current).update(is_correct=True)
+            answer.is_correct = current is not None
+
+            answer_accepted.send(
+                sender=self.model,
+                question_id=question.id,
+                user=user,
+                previous=previous,
+                current=current,
+            )
+        return answer
 
     def create_answer(self, author, question, text):
         answer = self.model(
@@ -223,28 +614,26 @@ class AnswerManager(models.Manager):
             text=text,
         )
 
-        answer.save()
+        with transaction.atomic():
+            answer.save()
+            search_backend().index_answer(answer)
+            answer_created.send(sender=self.model, answer=answer)
 
         return answer
 
-    def like_answer(self, answer, user):
-        l = AnswerLikes.model(
-            answer=answer,
-            user=user,
-        )
+    def vote_models(self):
+        return AnswerLikes, AnswerDislikes, "answer"
 
-        l.save()
+    def like_answer(self, answer, user):
+        return self.vote(answer.id, user, like=True)
 
     def dislike_answer(self, answer, user):
-        l = AnswerLikes.model(
-            answer=answer,
-            user=user,
-        )
+        return self.vote(answer.id, user, like=False)
 
-        l.save()
 
+class Answer(CountedModel):
+    counted_by = ("question", "answers_count", 0)
 
-class Answer(models.Model):
     objects = AnswerManager()
     author = models.ForeignKey(User, on_delete=models.CASCADE)
 
@@ -252,11 +641,27 @@ class Answer(models.Model):
     text = models.TextField(verbose_name="Answer text")
     is_correct = models.BooleanField(default=False, verbose_name="Answer corrective")
 
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    rating = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["question", "-is_correct", "-rating", "id"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["question"],
+                condition=Q(is_correct=True),
+                name="one_correct_answer_per_question",
+            )
+        ]
+
     def __str__(self):
         return self.text
 
 
-class AnswerLikes(models.Model):
+class AnswerLikes(CountedModel):
+    counted_by = ("answer", "likes_count", 1)
+
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
@@ -265,10 +670,94 @@ class AnswerLikes(models.Model):
         db_table = 'answer_likes'
 
 
-class AnswerDislikes(models.Model):
+class AnswerDislikes(CountedModel):
+    counted_by = ("answer", "dislikes_count", -1)
+
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
     class Meta:
         unique_together = (("answer", "user"),)
         db_table = 'answer_dislikes'
+
+
+class ReputationEventManager(models.Manager):
+    def record(
+        self, user_id, kind, sign=1, actor=None, question_id=None, answer_id=None
+    ):
+        points = REPUTATION_POINTS[kind] * sign
+        self.create(
+            user_id=user_id,
+            actor=actor,
+            kind=kind,
+            points=points,
+            question_id=question_id,
+            answer_id=answer_id,
+        )
+        User.objects.filter(pk=user_id).update(reputation=F("reputation") + points)
+        return points
+
+    def record_accept(self, actor, previous, current):
+        authors = dict(
+            Answer.objects.filter(pk__in=[previous, current]).values_list(
+                "id", "author_id"
+            )
+        )
+        for pk, sign in ((previous, -1), (current, 1)):
+            # accepting one's own answer earns nothing
+            if pk and authors[pk] != actor.pk:
+                self.record(authors[pk], "answer_correct", sign, actor, answer_id=pk)
+        return list(authors.values())
+
+    def record_vote(self, model, pk, actor, previous, current):
+        kind = "question" if model is Question else "answer"
+        author_id = (
+            model.objects.filter(pk=pk).values_list("author_id", flat=True).get()
+        )
+        target = {kind + "_id": pk}
+        if author_id == actor.pk:
+            # votes on one's own posts count, but earn no reputation
+            return author_id
+
+        # A changed vote reverses the old event and appends the new one.
+        for vote, sign in ((previous, -1), (current, 1)):
+            if vote:
+                suffix = "_like" if vote > 0 else "_dislike"
+                self.record(author_id, kind + suffix, sign, actor, **target)
+        return author_id
+
+
+class ReputationEvent(models.Model):
+    """
+    Append-only ledger of reputation changes; ``User.reputation`` is the
+    sum of ``points`` per user. Undoing a vote appends a negative event.
+    """
+
+    KINDS = [
+        ("question_like", "Question liked"),
+        ("question_dislike", "Question disliked"),
+        ("answer_like", "Answer liked"),
+        ("answer_dislike", "Answer disliked"),
+        ("answer_correct", "Answer marked correct"),
+    ]
+
+    objects = ReputationEventManager()
+
+    # the user whose reputation changes, and the one who caused it
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    actor = models.ForeignKey(
+        User, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    points = models.IntegerField()
+    # Deleting the post keeps its events, and the points they carry.
+    question = models.ForeignKey(
+        Question, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    answer = models.ForeignKey(
+        Answer, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    create_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-create_date"])]
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from .threads import in_thread
+
+VERSION_KEY = "questions:version:%s"
+PAGE_KEY = "questions:page:%s"
+STATS_KEY = "questions:pagecache:%s:%s"
+
+
+def page_cache_timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 60)
+
+
+def get_versions(scopes):
+    keys = [VERSION_KEY % scope for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh version must never collide with one that was evicted,
+            # otherwise pages rendered before the eviction would come back.
+            cache.add(key, int(time.time() * 1000), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*scopes):
+    for scope in scopes:
+        key = VERSION_KEY % scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), None)
+
+
+def invalidate_on_commit(*scopes):
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+def count(view_name, event):
+    key = STATS_KEY % (view_name, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def page_cache_stats(view_names=("index", "hot", "tag", "question")):
+    keys = [
+        STATS_KEY % (name, event) for name in view_names for event in ("hit", "miss")
+    ]
+    values = cache.get_many(keys)
+    return {
+        name: {
+            event: values.get(STATS_KEY % (name, event), 0)
+            for event in ("hit", "miss")
+        }
+        for name in view_names
+    }
+
+
+def is_anonymous(request):
+    # Without a session cookie nobody can be logged in, so skip loading the
+    # session and the user altogether.
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        request.user = AnonymousUser()
+        return True
+    return not request.user.is_authenticated
+
+
+def cache_for_anonymous(view_name, scopes):
+    """
+    Cache the rendered page of ``view_name`` for anonymous GET requests.
+
+    ``scopes`` maps the view kwargs to the version scopes the page depends
+    on; bumping any of them with ``invalidate`` orphans every cached copy.
+    Works on both sync and async views.
+    """
+
+    def lookup(request, kwargs):
+        # (key, cached response); the key is None when the page is not cached
+        if request.method not in ("GET", "HEAD") or not is_anonymous(request):
+            return None, None
+
+        versions = get_versions(scopes(**kwargs))
+        raw = "%s:%s:%s" % (view_name, versions, request.get_full_path())
+        key = PAGE_KEY % hashlib.md5(raw.encode()).hexdigest()
+
+        cached = cache.get(key)
+        if cached is None:
+            count(view_name, "miss")
+            return key, None
+
+        count(view_name, "hit")
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+        patch_vary_headers(response, ("Cookie",))
+        return key, response
+
+    def store(key, response):
+        if key is None:
+            return response
+        if response.status_code == 200 and not response.streaming:
+            cache.set(
+                key, (response.content, response["Content-Type"]), page_cache_timeout()
+            )
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key, response = await in_thread(lookup)(request, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    response = await in_thread(store)(key, response)
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, response = lookup(request, kwargs)
+            if response is None:
+                response = store(key, view(request, *args, **kwargs))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def on_question_created(sender, question, **kwargs):
+    tags = question.tags.values_list("title", flat=True)
+    invalidate_on_commit("index", "hot", *["tag:%s" % title for title in tags])
+
+
+def on_answer_created(sender, answer, **kwargs):
+    invalidate_on_commit("question:%s" % answer.question_id)
+
+
+def on_answer_accepted(sender, question_id, **kwargs):
+    invalidate_on_commit("question:%s" % question_id)
+
+
+def on_vote_cast(sender, pk, **kwargs):
+    from .models import Answer
+
+    if sender is Answer:
+        pk = Answer.objects.filter(pk=pk).values_list("question_id", flat=True).get()
+    invalidate_on_commit("question:%s" % pk)
@@ -0,0 +1,149 @@
+import base64
+import json
+from math import ceil
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(v) for v in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+class CountedPaginator(Paginator):
+    """
+    Page number paginator given its total up front, typically a stored
+    counter, so rendering a page runs no ``COUNT(*)``.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class KeysetPaginator:
+    """
+    Seek paginator over a queryset ordered by ``keys`` (``order_by`` style,
+    the last key must be unique). Every page is one indexed range scan of
+    ``per_page + 1`` rows no matter how deep it is.
+    """
+
+    def __init__(self, object_list, per_page, keys, count_key=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.keys = [(k.lstrip("-"), k.startswith("-")) for k in keys]
+        self.count_key = count_key
+
+    @property
+    def count(self):
+        # Optional total for the "last" link, cached because it is a full scan.
+        if self.count_key is None:
+            return None
+        return cache.get_or_set(
+            "questions:count:%s" % self.count_key,
+            self.object_list.order_by().count,
+            getattr(settings, "PAGINATOR_COUNT_TIMEOUT", 300),
+        )
+
+    @property
+    def num_pages(self):
+        count = self.count
+        if count is None:
+            return None
+        return max(ceil(count / self.per_page), 1)
+
+    def ordered(self, reverse=False):
+        order = []
+        for name, desc in self.keys:
+            order.append(name if desc == reverse else "-" + name)
+        return self.object_list.order_by(*order)
+
+    def seek(self, values, reverse=False):
+        if len(values) != len(self.keys):
+            raise ValueError("Malformed cursor")
+        model = self.object_list.model
+        values = [
+            model._meta.get_field(name).to_python(raw)
+            for (name, _), raw in zip(self.keys, values)
+        ]
+
+        # (a < x) OR (a = x AND b < y) OR ... for the sort direction
+        condition = Q()
+        for i, (name, desc) in enumerate(self.keys):
+            op = "lt" if desc != reverse else "gt"
+            step = Q(**{"%s__%s" % (name, op): values[i]})
+            for j in range(i):
+                step &= Q(**{self.keys[j][0]: values[j]})
+            condition |= step
+        return condition
+
+    def cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name) for name, _ in self.keys])
+
+    def get_page(self, after=None, before=None, last=False):
+        try:
+            if before:
+                rows = self.ordered(reverse=True).filter(
+                    self.seek(decode_cursor(before), reverse=True)
+                )
+            elif after:
+                rows = self.ordered().filter(self.seek(decode_cursor(after)))
+            elif last:
+                rows = self.ordered(reverse=True)
+            else:
+                rows = self.ordered()
+            rows = list(rows[: self.per_page + 1])
+        except (ValueError, TypeError, ValidationError):
+            after = before = last = None
+            rows = list(self.ordered()[: self.per_page + 1])
+
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if before or last:
+            rows.reverse()
+            return KeysetPage(self, rows, has_previous=more, has_next=bool(before))
+        return KeysetPage(self, rows, has_previous=bool(after), has_next=more)
+
+
+class KeysetPage:
+    cursor_mode = True
+
+    def __init__(self, paginator, object_list, has_previous, has_next):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+        # Cursors are taken from the seek rows, so views may swap object_list
+        # for the objects they actually render.
+        if object_list:
+            self._previous_cursor = paginator.cursor_for(object_list[0])
+            self._next_cursor = paginator.cursor_for(object_list[-1])
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def previous_cursor(self):
+        return self._previous_cursor
+
+    def next_cursor(self):
+        return self._next_cursor
@@ -0,0 +1,84 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from .metrics import registry
+
+BUCKET_KEY = "questions:ratelimit:%s"
+
+
+def take(name, capacity, per_minute, now=None):
+    """
+    Take a token from the bucket ``name`` holding up to ``capacity`` tokens
+    and refilled at ``per_minute``. Returns the seconds until a token is
+    available, 0 when one was taken.
+
+    The read-modify-write is not atomic, concurrent requests may both win
+    the last token; that is fine for shedding brute-force bursts.
+    """
+    now = time.time() if now is None else now
+    key = BUCKET_KEY % hashlib.md5(name.encode()).hexdigest()
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * per_minute / 60)
+
+    if tokens < 1:
+        return (1 - tokens) * 60 / per_minute
+    cache.set(key, (tokens - 1, now), int(capacity * 60 / per_minute) + 1)
+    return 0
+
+
+def client_ip(request):
+    """
+    The client's address. Behind ``TRUSTED_PROXY_COUNT`` reverse proxies,
+    each appending the address it was reached from to X-Forwarded-For, that
+    is the entry the outermost proxy added; anything left of it is supplied
+    by the client and cannot be trusted.
+    """
+    proxies = getattr(settings, "TRUSTED_PROXY_COUNT", 0)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if proxies and hops:
+        return hops[-min(proxies, len(hops))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def rate_limited(scope):
+    """
+    Refuse POSTs to the view with 429 once the client's IP or the submitted
+    login runs out of tokens, before any password is hashed. Bucket sizes
+    come from ``settings.RATE_LIMITS``.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limits = getattr(settings, "RATE_LIMITS", {})
+            if request.method != "POST" or not limits:
+                return view(request, *args, **kwargs)
+
+            buckets = [("ip", client_ip(request))]
+            if request.POST.get("login"):
+                buckets.append(("login", request.POST["login"].lower()))
+
+            wait = 0
+            for kind, value in buckets:
+                if kind in limits:
+                    name = "%s:%s:%s" % (scope, kind, value)
+                    wait = max(wait, take(name, *limits[kind]))
+            if not wait:
+                return view(request, *args, **kwargs)
+
+            registry.inc("questions_rate_limited_total", scope)
+            response = HttpResponse(
+                "Too many attempts, try again in %i seconds." % (wait + 1),
+                status=429,
+                content_type="text/plain",
+            )
+            response["Retry-After"] = int(wait) + 1
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import ReputationEvent, User
+
+LEADERBOARD_KEY = "questions:leaderboard"
+LEADERBOARD_FIELDS = ("id", "first_name", "last_name", "reputation")
+
+
+def leaderboard_size():
+    # Spare entries below the visible ones let a member drop a few places
+    # without the board having to be reloaded.
+    return 2 * getattr(settings, "SIDEBAR_SIZE", 10)
+
+
+def leaderboard_timeout():
+    # Updates are a read-modify-write, so two at once can lose one; the
+    # expiry and the reload on every sidebar refresh bound how long for.
+    return getattr(settings, "LEADERBOARD_TIMEOUT", 3600)
+
+
+def rank(entry):
+    return -entry["reputation"], entry["id"]
+
+
+def rebuild_leaderboard():
+    users = User.objects.best_users(leaderboard_size())
+    board = list(users.values(*LEADERBOARD_FIELDS))
+    cache.set(LEADERBOARD_KEY, board, leaderboard_timeout())
+    return board
+
+
+def top_users(limit):
+    board = cache.get(LEADERBOARD_KEY)
+    if board is None:
+        board = rebuild_leaderboard()
+    return board[:limit]
+
+
+def update_leaderboard(user_id):
+    """
+    Move one user to their current place on the cached top-N board. Every
+    user off the board ranks below its last entry, so the board is only
+    reloaded when a member drops into that last place.
+    """
+    board = cache.get(LEADERBOARD_KEY)
+    if board is None:
+        return
+
+    size = leaderboard_size()
+    full = len(board) >= size
+    row = User.objects.filter(pk=user_id).values(*LEADERBOARD_FIELDS).first()
+    members = [entry for entry in board if entry["id"] != user_id]
+    was_member = len(members) < len(board)
+
+    if row is not None and (not full or was_member or rank(row) < rank(board[-1])):
+        members.append(row)
+        members.sort(key=rank)
+        if full and was_member and members[-1] is row:
+            rebuild_leaderboard()
+            return
+    elif full and was_member:
+        rebuild_leaderboard()
+        return
+
+    cache.set(LEADERBOARD_KEY, members[:size], leaderboard_timeout())
+
+
+def on_vote_cast(sender, pk, user, previous, current, **kwargs):
+    author_id = ReputationEvent.objects.record_vote(sender, pk, user, previous, current)
+    transaction.on_commit(lambda: update_leaderboard(author_id))
+
+
+def on_answer_accepted(sender, user, previous, current, **kwargs):
+    authors = ReputationEvent.objects.record_accept(user, previous, current)
+
+    def update():
+        for author_id in authors:
+            update_leaderboard(author_id)
+
+    transaction.on_commit(update)
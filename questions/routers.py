@@ -0,0 +1,24 @@
+import contextvars
+
+# Set by ReplicaStickinessMiddleware for requests that may read stale data.
+read_from_replica = contextvars.ContextVar("read_from_replica", default=False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to "default". Reads go to "replica" only while the
+    current request opted in, so management commands, POSTs and clients
+    that just wrote keep reading their own writes from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return "replica" if read_from_replica.get() else "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
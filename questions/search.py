@@ -0,0 +1,192 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchBackend:
+    def create_index(self):
+        pass
+
+    def index_question(self, question):
+        raise NotImplementedError
+
+    def index_answer(self, answer):
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        """Return ids of matching questions, best match first."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+
+class SqliteFtsBackend(SearchBackend):
+    # One document per question and per answer; answers rank their question.
+    table = "questions_search"
+
+    def create_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5("
+                "question_id UNINDEXED, title, text, tokenize='unicode61')"
+                % self.table
+            )
+
+    def add(self, question_id, title, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO %s (question_id, title, text) VALUES (%%s, %%s, %%s)"
+                % self.table,
+                [question_id, title, text],
+            )
+
+    def index_question(self, question):
+        self.add(question.id, question.title, question.text)
+
+    def index_answer(self, answer):
+        self.add(answer.question_id, "", answer.text)
+
+    def match_expression(self, query):
+        words = WORD_RE.findall(query)
+        if not words:
+            return None
+        terms = ['"%s"' % w for w in words]
+        terms[-1] += "*"
+        return " ".join(terms)
+
+    def search(self, query, limit):
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT question_id FROM %s WHERE %s MATCH %%s "
+                "AND rank MATCH 'bm25(0, 4.0, 1.0)' "
+                "GROUP BY question_id ORDER BY MIN(rank) LIMIT %%s"
+                % (self.table, self.table),
+                [expression, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild(self):
+        from .models import Question, Answer
+
+        self.create_index()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM %s" % self.table)
+            cursor.execute(
+                "INSERT INTO %s (question_id, title, text) SELECT id, title, text "
+                "FROM %s" % (self.table, Question._meta.db_table)
+            )
+            cursor.execute(
+                "INSERT INTO %s (question_id, title, text) "
+                "SELECT question_id, '', text FROM %s"
+                % (self.table, Answer._meta.db_table)
+            )
+            cursor.execute(
+                "INSERT INTO %s(%s) VALUES ('optimize')" % (self.table, self.table)
+            )
+
+
+class PostgresFtsBackend(SearchBackend):
+    """
+    The same one-document-per-question-or-answer layout as SqliteFtsBackend,
+    as a tsvector column under a GIN index. Titles are weighted above text.
+    """
+
+    table = "questions_search"
+    config = "simple"
+
+    def create_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS %s "
+                "(question_id integer NOT NULL, document tsvector NOT NULL)"
+                % self.table
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS %s_document ON %s USING gin (document)"
+                % (self.table, self.table)
+            )
+
+    def document(self, title, text):
+        return (
+            "setweight(to_tsvector('%s', %s), 'A') || "
+            "setweight(to_tsvector('%s', %s), 'B')"
+            % (self.config, title, self.config, text)
+        )
+
+    def add(self, question_id, title, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO %s (question_id, document) VALUES (%%s, %s)"
+                % (self.table, self.document("%s", "%s")),
+                [question_id, title, text],
+            )
+
+    def index_question(self, question):
+        self.add(question.id, question.title, question.text)
+
+    def index_answer(self, answer):
+        self.add(answer.question_id, "", answer.text)
+
+    def tsquery(self, query):
+        words = WORD_RE.findall(query)
+        if not words:
+            return None
+        words[-1] += ":*"
+        return " & ".join(words)
+
+    def search(self, query, limit):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT question_id FROM %s, to_tsquery('%s', %%s) query "
+                "WHERE document @@ query GROUP BY question_id "
+                "ORDER BY MAX(ts_rank(document, query)) DESC LIMIT %%s"
+                % (self.table, self.config),
+                [tsquery, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild(self):
+        from .models import Question, Answer
+
+        self.create_index()
+        with connection.cursor() as cursor:
+            cursor.execute("TRUNCATE %s" % self.table)
+            cursor.execute(
+                "INSERT INTO %s (question_id, document) SELECT id, %s FROM %s"
+                % (
+                    self.table,
+                    self.document("title", "text"),
+                    Question._meta.db_table,
+                )
+            )
+            cursor.execute(
+                "INSERT INTO %s (question_id, document) SELECT question_id, %s "
+                "FROM %s"
+                % (self.table, self.document("''", "text"), Answer._meta.db_table)
+            )
+
+
+_backend = None
+
+
+def search_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(
+            getattr(settings, "SEARCH_BACKEND", "questions.search.SqliteFtsBackend")
+        )()
+    return _backend
+
+
+def create_search_index(**kwargs):
+    search_backend().create_index()
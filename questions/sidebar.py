@@ -0,0 +1,65 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Tag
+from .reputation import LEADERBOARD_KEY, rebuild_leaderboard
+
+SIDEBAR_KEY = "questions:sidebar"
+SIDEBAR_LOCK_KEY = "questions:sidebar:lock"
+
+
+def sidebar_timeout():
+    return getattr(settings, "SIDEBAR_CACHE_TIMEOUT", 300)
+
+
+def sidebar_size():
+    return getattr(settings, "SIDEBAR_SIZE", 10)
+
+
+def compute_sidebar(size=None):
+    size = size or sidebar_size()
+    week = timezone.now() - timedelta(days=getattr(settings, "TRENDING_WINDOW_DAYS", 7))
+    return {
+        "tags": {
+            "week": list(Tag.objects.trending_tags(week, size)),
+            "all": list(Tag.objects.best_tags(size).values("title")),
+        },
+        "users": rebuild_leaderboard()[:size],
+    }
+
+
+def refresh_sidebar():
+    data = compute_sidebar()
+    # Entries outlive their freshness window so readers can keep serving
+    # the stale copy while a single request recomputes it.
+    entry = {"data": data, "fresh_until": time.time() + sidebar_timeout()}
+    cache.set(SIDEBAR_KEY, entry, sidebar_timeout() * 10)
+    return data
+
+
+def get_sidebar():
+    # The leaderboard is maintained incrementally, so it is read live rather
+    # than from the periodically refreshed copy; both come in one round trip.
+    found = cache.get_many([SIDEBAR_KEY, LEADERBOARD_KEY])
+    data = cached_sidebar(found.get(SIDEBAR_KEY))
+    board = found.get(LEADERBOARD_KEY)
+    if board is None:
+        return data
+    return dict(data, users=board[: sidebar_size()])
+
+
+def cached_sidebar(entry):
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["data"]
+
+    if cache.add(SIDEBAR_LOCK_KEY, True, 60):
+        try:
+            return refresh_sidebar()
+        finally:
+            cache.delete(SIDEBAR_LOCK_KEY)
+
+    if entry is not None:
+        return entry["data"]
+    return compute_sidebar()
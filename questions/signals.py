@@ -0,0 +1,19 @@
+from django.dispatch import Signal
+
+# Domain events sent by the model managers once the rows are written.
+# Receivers run inside the writing transaction, so side effects that must
+# only happen after commit should use transaction.on_commit().
+
+# sender=Question, question=<Question>
+question_created = Signal()
+
+# sender=Answer, answer=<Answer>
+answer_created = Signal()
+
+# sender=Answer, question_id=<id>, user=<question author>,
+# previous/current=<accepted answer id> before and after, or None
+answer_accepted = Signal()
+
+# sender=Question|Answer, pk=<voted object id>, user=<User>,
+# previous/current=1 (like), -1 (dislike) or 0 (no vote)
+vote_cast = Signal()
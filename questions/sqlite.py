@@ -0,0 +1,24 @@
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    # Readers no longer block on, or block, the single writer.
+    "journal_mode": "WAL",
+    # Wait for the write lock instead of failing with "database is locked".
+    "busy_timeout": 5000,
+    # Durable across application crashes; in WAL mode only a power loss can
+    # drop the last transactions.
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative values are KiB: 64 MiB page cache per connection.
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite" or not getattr(settings, "SQLITE_TUNED", False):
+        return
+    pragmas = dict(DEFAULT_PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {}))
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA %s = %s" % (name, value))
@@ -0,0 +1,55 @@
+import gzip
+import os
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".css", ".js", ".map", ".svg", ".txt", ".json", ".ico", ".eot", ".ttf")
+
+# Encodings in order of preference, with the suffix of the precompressed file.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def compress(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data)))
+
+    for suffix, compressed in variants:
+        # Not worth a second request path when it saves less than 5%.
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic writes content-hashed copies plus a manifest, then
+    precompresses every text asset next to them as .gz (and .br when the
+    brotli package is installed).
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in list(paths) + list(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self.path(name))
+
+    def immutable_names(self):
+        return set(self.hashed_files.values())
+
+
+def find_files(root):
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            yield os.path.relpath(path, root).replace(os.sep, "/"), path
@@ -0,0 +1,745 @@
+import os
+import random
+import tempfile
+import threading
+from importlib import import_module
+from io import StringIO
+from datetime import timedelta
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .corpus import read_rows, write_chunk
+from .hashers import ScryptPasswordHasher
+from .models import (
+    Answer,
+    Question,
+    QuestionDislikes,
+    QuestionLikes,
+    ReputationEvent,
+    Tag,
+    TagActivity,
+    TaggedQuestion,
+    User,
+)
+from .pagination import KeysetPaginator, encode_cursor
+from .ratelimit import take
+
+
+def make_user(username="ann"):
+    return User.objects.create_user(
+        username, username + "@example.com", username, "12345", "uploads/a.jpg"
+    )
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user()
+        now = timezone.now()
+        # pairs of questions share a date, so the id decides within a pair
+        Question.objects.bulk_create(
+            Question(
+                author=author,
+                title="question %i" % i,
+                text="text",
+                create_date=now - timedelta(minutes=i // 2),
+            )
+            for i in range(95)
+        )
+        cls.ordered = list(
+            Question.objects.order_by("-create_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+    def paginator(self):
+        return KeysetPaginator(Question.objects.all(), 10, ("-create_date", "-id"))
+
+    def get_page(self, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            page = self.paginator().get_page(**kwargs)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertNotIn("OFFSET", sql.upper())
+        self.assertIn("LIMIT 11", sql)
+        return page
+
+    def cursor_at(self, index):
+        question = Question.objects.get(pk=self.ordered[index])
+        return self.paginator().cursor_for(question)
+
+    def ids(self, page):
+        return [question.id for question in page]
+
+    def test_first_page(self):
+        page = self.get_page()
+        self.assertEqual(self.ids(page), self.ordered[:10])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_deep_page_costs_the_same_query(self):
+        shallow = self.get_page(after=self.cursor_at(9))
+        deep = self.get_page(after=self.cursor_at(79))
+        self.assertEqual(self.ids(shallow), self.ordered[10:20])
+        self.assertEqual(self.ids(deep), self.ordered[80:90])
+        self.assertTrue(deep.has_previous())
+        self.assertTrue(deep.has_next())
+
+    def test_walk_visits_every_row_once(self):
+        seen = []
+        page = self.get_page()
+        seen += self.ids(page)
+        while page.has_next():
+            page = self.get_page(after=page.next_cursor())
+            seen += self.ids(page)
+        self.assertEqual(seen, self.ordered)
+
+    def test_before_goes_back(self):
+        page = self.get_page(before=self.cursor_at(50))
+        self.assertEqual(self.ids(page), self.ordered[40:50])
+        self.assertTrue(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_last_page(self):
+        page = self.get_page(last=True)
+        self.assertEqual(self.ids(page), self.ordered[-10:])
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+
+    def test_tampered_cursors_fall_back_to_first_page(self):
+        for cursor in (
+            "!!!",
+            "bm90IGpzb24",
+            encode_cursor(["2020-01-01"]),
+            encode_cursor(["not a date", "1"]),
+            encode_cursor(["2020-01-01T00:00:00+00:00", "x"]),
+        ):
+            with self.subTest(cursor=cursor):
+                page = self.get_page(after=cursor)
+                self.assertEqual(self.ids(page), self.ordered[:10])
+                self.assertFalse(page.has_previous())
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class QueryBudgetTests(TestCase):
+    """
+    Fixed query counts for the main pages. Every page lists several
+    questions or answers with authors and tags, so a query per row would
+    go over budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        for i in range(15):
+            cls.question = Question.objects.create_question(
+                cls.user, "question %i" % i, "text", "python django tag%i" % (i % 3)
+            )
+            for _ in range(5):
+                Answer.objects.create_answer(cls.user, cls.question, "answer")
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        return ["/", "/hot/", "/tag/python/", "/question/%i/" % self.question.id]
+
+    def test_anonymous_render(self):
+        # page, tag prefetch and page count or total, plus the sidebar
+        budgets = [6, 6, 8, 6]
+        for url, budget in zip(self.urls(), budgets):
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(budget):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_anonymous_cached(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_answer_pages_use_the_stored_count(self):
+        url = "/question/%i/?page=2" % self.question.id
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get(url)
+        self.assertEqual(page.context["paginate"].paginator.num_pages, 2)
+        self.assertEqual(len(page.context["paginate"]), 1)
+        for query in queries:
+            self.assertNotIn("COUNT(", query["sql"].upper())
+
+    def assert_logged_in_budgets(self, budgets):
+        self.client.force_login(self.user)
+        for url, budget in zip(self.urls(), budgets):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(budget):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_logged_in(self):
+        # the session and the user row come from the database
+        self.assert_logged_in_budgets([4, 4, 6, 5])
+
+    @override_settings(
+        SHARED_CACHE=True,
+        SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    )
+    def test_logged_in_shared_cache(self):
+        self.assert_logged_in_budgets([2, 2, 4, 3])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.question = Question.objects.create_question(
+            cls.user, "question", "text", "python"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_question_page_carries_no_csrf_token(self):
+        url = "/question/%i/" % self.question.id
+        first = Client(enforce_csrf_checks=True).get(url)
+        second = Client(enforce_csrf_checks=True)
+        page = second.get(url)
+        self.assertEqual(page.content, first.content)
+        self.assertNotIn(b'name="csrfmiddlewaretoken"', page.content)
+        self.assertNotIn("csrftoken", first.cookies)
+        self.assertContains(page, "Log in</a> to answer")
+
+    def assert_cached(self, url):
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_writes_invalidate_the_pages_they_change(self):
+        question_url = "/question/%i/" % self.question.id
+        for url in ("/", "/hot/", "/tag/python/", question_url):
+            self.assert_cached(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create_question(self.user, "brand new", "text", "python")
+        for url in ("/", "/hot/", "/tag/python/"):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "brand new")
+        with self.assertNumQueries(0):
+            self.client.get(question_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            answer = Answer.objects.create_answer(
+                self.user, self.question, "fresh answer"
+            )
+        self.assertContains(self.client.get(question_url), "fresh answer")
+        self.assertNotContains(self.client.get(question_url), "Correct!")
+        with self.assertNumQueries(0):
+            self.client.get("/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.accept(answer.id, self.user)
+        self.assertContains(self.client.get(question_url), "Correct!")
+
+    def test_logged_in_question_page_has_answer_form(self):
+        self.client.force_login(self.user)
+        page = self.client.get("/question/%i/" % self.question.id)
+        self.assertContains(page, 'name="csrfmiddlewaretoken"')
+        self.assertIn("csrftoken", page.cookies)
+
+
+class ReputationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user()
+        cls.voter = make_user("bob")
+        cls.question = Question.objects.create_question(
+            cls.author, "question", "text", "python"
+        )
+
+    def reputation(self):
+        return User.objects.get(pk=self.author.pk).reputation
+
+    def test_vote_toggles_and_earns_reputation(self):
+        Question.objects.like_question(self.question, self.voter)
+        liked = self.reputation()
+        self.assertGreater(liked, 0)
+        counters = Question.objects.like_question(self.question, self.voter)
+        self.assertEqual(counters["likes_count"], 0)
+        self.assertEqual(self.reputation(), 0)
+
+    def test_deleting_a_post_keeps_its_reputation(self):
+        Question.objects.like_question(self.question, self.voter)
+        earned = self.reputation()
+        Question.objects.filter(pk=self.question.pk).delete()
+        ledger = ReputationEvent.objects.filter(user=self.author)
+        self.assertEqual(ledger.aggregate(total=Sum("points"))["total"], earned)
+        call_command("rebuild_reputation", stdout=StringIO())
+        self.assertEqual(self.reputation(), earned)
+
+    def test_self_vote_earns_nothing(self):
+        counters = Question.objects.like_question(self.question, self.author)
+        self.assertEqual(counters["likes_count"], 1)
+        self.assertEqual(self.reputation(), 0)
+
+
+class CorpusTests(TestCase):
+    def test_datetimes_keep_microseconds(self):
+        when = timezone.now().replace(microsecond=123456)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rows.jsonl.gz")
+            with open(path, "wb") as f:
+                write_chunk(f, [{"create_date": when}])
+            (row,) = read_rows(path)
+        field = Question._meta.get_field("create_date")
+        self.assertEqual(field.to_python(row["create_date"]), when)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.in_text = Question.objects.create_question(
+            cls.user, "Packaging", "how do I install django with pip", "python"
+        )
+        cls.in_title = Question.objects.create_question(
+            cls.user, "Django install fails", "the wheel does not build", "python"
+        )
+
+    def search(self, query):
+        return Question.objects.search(query)
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("django"), [self.in_title.id, self.in_text.id])
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(self.search("whe"), [self.in_title.id])
+        self.assertEqual(self.search("pip wheel"), [])
+
+    def test_new_questions_and_answers_are_indexed(self):
+        self.assertEqual(self.search("virtualenv"), [])
+        question = Question.objects.create_question(
+            self.user, "Virtualenv location", "where should it live", "python"
+        )
+        self.assertEqual(self.search("virtualenv"), [question.id])
+        Answer.objects.create_answer(self.user, self.in_text, "use a virtualenv")
+        self.assertEqual(self.search("virtualenv"), [question.id, self.in_text.id])
+
+    def test_search_page(self):
+        page = self.client.get("/search/", {"q": "django install"})
+        self.assertEqual(
+            [q.id for q in page.context["paginate"]],
+            [self.in_title.id, self.in_text.id],
+        )
+        self.assertContains(page, "Django install fails")
+
+
+class TagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+
+    def titles(self, question):
+        return sorted(question.tags.values_list("title", flat=True))
+
+    def test_parse_normalizes_and_deduplicates(self):
+        self.assertEqual(
+            Tag.objects.parse(" Python,django  PYTHON,, Django "), ["python", "django"]
+        )
+
+    def test_create_question_reuses_and_creates_tags(self):
+        Tag.objects.create(title="python")
+        question = Question.objects.create_question(
+            self.user, "question", "text", "Python DJANGO orm"
+        )
+        self.assertEqual(self.titles(question), ["django", "orm", "python"])
+        self.assertEqual(Tag.objects.count(), 3)
+        counts = Tag.objects.values_list("questions_count", flat=True)
+        self.assertEqual(set(counts), {1})
+
+    def test_tag_queries_do_not_grow_with_tag_count(self):
+        def queries(tags):
+            with CaptureQueriesContext(connection) as captured:
+                Question.objects.create_question(self.user, "question", "text", tags)
+            return len(captured)
+
+        self.assertEqual(queries("a1"), queries("b1 b2 b3 b4 b5"))
+
+    def make_duplicates(self):
+        # the same tag spelled three ways, one question carrying two of them
+        upper = Tag.objects.create(title="Python")
+        lower = Tag.objects.create(title="python")
+        spaced = Tag.objects.create(title=" PYTHON")
+        first = Question.objects.create_question(self.user, "first", "text", "")
+        second = Question.objects.create_question(self.user, "second", "text", "")
+        for question, tag in ((first, upper), (first, lower), (second, spaced)):
+            TaggedQuestion.objects.create(
+                question=question, tag=tag, create_date=question.create_date
+            )
+        return lower, first, second
+
+    def assert_merged(self, kept, first, second):
+        self.assertEqual(
+            list(Tag.objects.values_list("id", "title")), [(kept.id, "python")]
+        )
+        self.assertEqual(self.titles(first), ["python"])
+        self.assertEqual(self.titles(second), ["python"])
+
+    def test_normalize_tags_merges_case_duplicates(self):
+        kept, first, second = self.make_duplicates()
+        call_command("normalize_tags", stdout=StringIO())
+        self.assert_merged(kept, first, second)
+        self.assertEqual(Tag.objects.get().questions_count, 2)
+
+    def test_migration_merges_case_duplicates(self):
+        migration = import_module("questions.migrations.0002_tagged_question")
+        kept, first, second = self.make_duplicates()
+        migration.merge_duplicate_tags(apps, None)
+        self.assert_merged(kept, first, second)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    RATE_LIMITS={"ip": (2, 1), "login": (3, 1)},
+    SCRYPT_WORK_FACTOR=2 ** 10,
+)
+class SignInTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+
+    def setUp(self):
+        cache.clear()
+
+    def sign_in(self, password="wrong", login="ann", **headers):
+        return self.client.post(
+            "/login/", {"login": login, "password": password}, **headers
+        )
+
+    def test_bucket_refills_over_time(self):
+        self.assertEqual(take("bucket", 2, 60, now=0), 0)
+        self.assertEqual(take("bucket", 2, 60, now=0), 0)
+        self.assertAlmostEqual(take("bucket", 2, 60, now=0.5), 0.5)
+        self.assertEqual(take("bucket", 2, 60, now=1), 0)
+
+    def test_ip_bucket_answers_429(self):
+        for _ in range(2):
+            self.assertEqual(self.sign_in(login="x").status_code, 200)
+        response = self.sign_in(login="y")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_login_bucket_spans_addresses(self):
+        for i in range(3):
+            self.sign_in(REMOTE_ADDR="10.0.0.%i" % i)
+        self.assertEqual(self.sign_in(REMOTE_ADDR="10.0.0.9").status_code, 429)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_clients_behind_a_proxy_get_their_own_bucket(self):
+        proxy = {"REMOTE_ADDR": "10.0.0.1"}
+        for _ in range(2):
+            self.sign_in(login="x", HTTP_X_FORWARDED_FOR="1.1.1.1", **proxy)
+        # a spoofed entry left of the proxy's own one changes nothing
+        blocked = self.sign_in(
+            login="y", HTTP_X_FORWARDED_FOR="2.2.2.2, 1.1.1.1", **proxy
+        )
+        self.assertEqual(blocked.status_code, 429)
+        other = self.sign_in(login="z", HTTP_X_FORWARDED_FOR="2.2.2.2", **proxy)
+        self.assertEqual(other.status_code, 200)
+
+    def test_sign_in_upgrades_old_hashes(self):
+        for old in (
+            make_password("12345", hasher="pbkdf2_sha256"),
+            # scrypt with a different work factor than configured
+            ScryptPasswordHasher().encode("12345", "salt", n=2 ** 11),
+        ):
+            with self.subTest(old=old.split("$")[:2]):
+                User.objects.filter(pk=self.user.pk).update(password=old)
+                cache.clear()
+                self.assertEqual(self.sign_in("12345").status_code, 302)
+                password = User.objects.get(pk=self.user.pk).password
+                self.assertTrue(password.startswith("scrypt$1024$"))
+                self.client.logout()
+
+
+class ConcurrentWriteTests(TransactionTestCase):
+    def setUp(self):
+        # bulk_create schedules no avatar processing, which would outlive the test
+        User.objects.bulk_create(
+            User(username="user%i" % i, upload="uploads/a.jpg") for i in range(11)
+        )
+        self.author, *self.voters = User.objects.order_by("id")
+        self.question = Question.objects.create_question(
+            self.author, "question", "text", ""
+        )
+
+    def run_threads(self, targets):
+        errors = []
+
+        def run(target, seed):
+            try:
+                target(random.Random(seed))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(target, i))
+            for i, target in enumerate(targets)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def voter(self, user, manager, pk):
+        def vote(rng):
+            for _ in range(20):
+                manager.vote(pk, user, rng.random() < 0.5)
+
+        return vote
+
+    def assert_ledger_matches(self):
+        for user in User.objects.all():
+            ledger = ReputationEvent.objects.filter(user=user)
+            total = ledger.aggregate(total=Sum("points"))["total"] or 0
+            self.assertEqual(user.reputation, total)
+
+    def test_concurrent_votes_neither_fail_nor_drift(self):
+        question = self.question
+        self.run_threads(
+            [self.voter(user, Question.objects, question.id) for user in self.voters]
+        )
+
+        likes = QuestionLikes.objects.filter(question=question).count()
+        dislikes = QuestionDislikes.objects.filter(question=question).count()
+        question.refresh_from_db()
+        self.assertEqual(
+            (question.likes_count, question.dislikes_count, question.rating),
+            (likes, dislikes, likes - dislikes),
+        )
+        expected = 5 * likes - 2 * dislikes
+        self.assertEqual(User.objects.get(pk=self.author.pk).reputation, expected)
+        self.assert_ledger_matches()
+
+    def test_accepts_racing_accepts_and_votes(self):
+        answers = [
+            Answer.objects.create_answer(user, self.question, "answer")
+            for user in self.voters[:3]
+        ]
+
+        def accept(rng):
+            for _ in range(20):
+                Answer.objects.accept(rng.choice(answers).id, self.author)
+
+        self.run_threads(
+            [accept, accept, accept]
+            + [self.voter(user, Answer.objects, answers[0].id) for user in self.voters]
+        )
+
+        accepted = Answer.objects.filter(question=self.question, is_correct=True)
+        self.assertLessEqual(accepted.count(), 1)
+        self.assert_ledger_matches()
+
+
+class TagActivityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Tag.objects.create(title="python")
+        cls.django = Tag.objects.create(title="django")
+        cls.now = timezone.now().replace(hour=12, minute=30, second=0, microsecond=0)
+
+    def record(self, tag, hours_ago, times=1):
+        for _ in range(times):
+            TagActivity.objects.record([tag.id], self.now - timedelta(hours=hours_ago))
+
+    def trending(self, hours):
+        since = self.now - timedelta(hours=hours)
+        return [
+            (row["title"], row["total"])
+            for row in TagActivity.objects.trending(since)
+        ]
+
+    def test_record_counts_per_hour(self):
+        self.record(self.python, 0, times=2)
+        self.record(self.python, 1)
+        buckets = TagActivity.objects.order_by("start")
+        self.assertEqual([b.count for b in buckets], [1, 2])
+        self.assertEqual({b.resolution for b in buckets}, {TagActivity.HOUR})
+
+    def test_hourly_window_is_exact(self):
+        self.record(self.python, 0)
+        self.record(self.django, 0, times=2)
+        self.record(self.python, 5, times=3)
+        self.assertEqual(self.trending(2), [("django", 2), ("python", 1)])
+        self.assertEqual(self.trending(6), [("python", 4), ("django", 2)])
+
+    def test_compact_folds_hours_into_days_and_drops_old_days(self):
+        self.record(self.python, 1)
+        # two hours of the same day, both older than the hourly retention
+        self.record(self.python, 24 * 3 + 1, times=2)
+        self.record(self.python, 24 * 3 + 2)
+        self.record(self.django, 24 * 20)
+        before = self.trending(24 * 10)
+
+        folded, dropped = TagActivity.objects.compact(
+            self.now, timedelta(hours=48), timedelta(days=10)
+        )
+
+        self.assertEqual(folded, 3)
+        self.assertEqual(dropped, 1)
+        rows = TagActivity.objects.order_by("start").values_list(
+            "tag__title", "resolution", "count"
+        )
+        self.assertEqual(
+            list(rows),
+            [("python", TagActivity.DAY, 3), ("python", TagActivity.HOUR, 1)],
+        )
+        # a window past the hourly retention is rounded to whole days
+        self.assertEqual(self.trending(24 * 10), before)
+        self.assertEqual(self.trending(24 * 3), [("python", 4)])
+        self.assertEqual(self.trending(24 * 4), [("python", 4)])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class AcceptAnswerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.asker = make_user()
+        cls.first_author = make_user("bob")
+        cls.second_author = make_user("cid")
+        cls.question = Question.objects.create_question(
+            cls.asker, "question", "text", "python"
+        )
+        cls.first = Answer.objects.create_answer(cls.first_author, cls.question, "a")
+        cls.second = Answer.objects.create_answer(
+            cls.second_author, cls.question, "b"
+        )
+
+    def accept(self, answer, user):
+        self.client.force_login(user)
+        return self.client.post("/answer/%i/accept" % answer.id)
+
+    def accepted(self):
+        rows = Answer.objects.filter(question=self.question, is_correct=True)
+        return list(rows.values_list("id", flat=True))
+
+    def reputation(self, user):
+        return User.objects.get(pk=user.pk).reputation
+
+    def test_only_the_question_author_may_accept(self):
+        self.assertEqual(self.accept(self.first, self.first_author).status_code, 403)
+        self.client.logout()
+        anonymous = self.client.post("/answer/%i/accept" % self.first.id)
+        self.assertRedirects(anonymous, "/login/", fetch_redirect_response=False)
+        self.assertEqual(self.accepted(), [])
+
+    def test_accept_switch_and_unmark_move_reputation(self):
+        response = self.accept(self.first, self.asker)
+        self.assertRedirects(
+            response,
+            Answer.objects.locate(self.first.id),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(self.accepted(), [self.first.id])
+        self.assertEqual(self.reputation(self.first_author), 15)
+
+        self.accept(self.second, self.asker)
+        self.assertEqual(self.accepted(), [self.second.id])
+        self.assertEqual(self.reputation(self.first_author), 0)
+        self.assertEqual(self.reputation(self.second_author), 15)
+
+        self.accept(self.second, self.asker)
+        self.assertEqual(self.accepted(), [])
+        self.assertEqual(self.reputation(self.second_author), 0)
+
+    def test_accepted_answer_is_listed_first(self):
+        self.accept(self.second, self.asker)
+        page = self.client.get("/question/%i/" % self.question.id)
+        ids = [answer.id for answer in page.context["paginate"]]
+        self.assertEqual(ids[0], self.second.id)
+
+    def test_one_accepted_answer_per_question(self):
+        Answer.objects.accept(self.first.id, self.asker)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Answer.objects.filter(pk=self.second.pk).update(is_correct=True)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class AnswerLocatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.voters = [make_user("voter%i" % i) for i in range(3)]
+        cls.question = Question.objects.create_question(
+            cls.user, "question", "text", "python"
+        )
+        answers = [
+            Answer.objects.create_answer(cls.user, cls.question, "answer %i" % i)
+            for i in range(10)
+        ]
+        # ratings 3, 2, 1 and -1 spread the answers over the pages
+        for answer, likes in ((answers[7], 3), (answers[2], 2), (answers[5], 1)):
+            for voter in cls.voters[:likes]:
+                Answer.objects.like_answer(answer, voter)
+        Answer.objects.dislike_answer(answers[0], cls.voters[0])
+        Answer.objects.accept(answers[9].id, cls.user)
+
+    def listed(self):
+        return list(
+            Answer.objects.get_answers_by_id(self.question.id).values_list(
+                "id", flat=True
+            )
+        )
+
+    def test_position_matches_the_listing(self):
+        listed = self.listed()
+        self.assertEqual(listed[0], Answer.objects.get(is_correct=True).id)
+        for index, pk in enumerate(listed):
+            with self.subTest(index=index):
+                answer = Answer.objects.get(pk=pk)
+                self.assertEqual(Answer.objects.position(answer), index)
+
+    def test_locate_costs_a_fixed_number_of_queries(self):
+        pk = self.listed()[-1]
+        with self.assertNumQueries(3):
+            url = Answer.objects.locate(pk)
+        self.assertEqual(url, "/question/%i/?page=3#answer-%i" % (self.question.id, pk))
+
+    def test_answer_redirect_lands_on_its_page(self):
+        for pk in self.listed():
+            with self.subTest(pk=pk):
+                response = self.client.get("/answer/%i/" % pk)
+                path, anchor = response["Location"].split("#")
+                self.assertEqual(anchor, "answer-%i" % pk)
+                # the page may come from the page cache, so check the HTML
+                self.assertContains(self.client.get(path), 'id="answer-%i"' % pk)
+
+    def test_posting_an_answer_redirects_to_it(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/question/%i/" % self.question.id, {"text": "newest answer"}
+        )
+        answer = Answer.objects.get(text="newest answer")
+        self.assertEqual(response["Location"], Answer.objects.locate(answer.id))
+        self.assertTrue(response["Location"].endswith("#answer-%i" % answer.id))
@@ -0,0 +1,21 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def in_thread(func):
+    """
+    Turn a blocking callable into an awaitable that runs on the executor's
+    worker threads rather than Django's single thread-sensitive one, so
+    several can run at once. The worker's database connections are released
+    afterwards according to CONN_MAX_AGE, like at the end of a request.
+    """
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
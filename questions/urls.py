@@ -6,11 +6,16 @@ urlpatterns = [
     path("question/<int:id>/", views.question, name="question"),
     path("tag/<tagname>/", views.tag, name="tag"),
     path("hot/", views.hot, name="hot"),
+    path("search/", views.search, name="search"),
     path("login/", views.sign_in, name="signIn"),
     path("signup/", views.sign_up, name="signUp"),
     path("ask/", views.ask, name="ask"),
     path("signout/", views.sign_out, name="signOut"),
     path("profile/<int:id>", views.profile, name="profile"),
     path("profile/edit", views.edit_profile, name="editProfile"),
-    # path("question/<int:id>/like", views.like_question, name="likeQuestion")
+    path("question/<int:id>/vote", views.vote_question, name="voteQuestion"),
+    path("answer/<int:id>/", views.answer, name="answer"),
+    path("answer/<int:id>/vote", views.vote_answer, name="voteAnswer"),
+    path("answer/<int:id>/accept", views.accept_answer, name="acceptAnswer"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
@@ -1,18 +1,31 @@
 from django.shortcuts import render, redirect, HttpResponseRedirect, get_object_or_404
-from django.http import Http404
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.http import urlencode
 from django.core.paginator import Paginator
 from django.contrib.auth import authenticate, login, logout
-from .models import Question, Tag, User, Answer
+from .models import ANSWERS_PER_PAGE, Question, Tag, User, Answer, TaggedQuestion
 from .forms import AuthForm, SignUpFrom, AddQuestionForm, AddAnswerForm, EditProfileForm
+from .metrics import registry
+from .pagecache import cache_for_anonymous, page_cache_stats
+from .pagination import CountedPaginator, KeysetPaginator
+from .ratelimit import rate_limited
+from .sidebar import get_sidebar
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.views.decorators.http import require_POST
 
 
 def get_tags_and_users():
-    return Tag.objects.best_tags(), User.objects.best_users()
+    sidebar = get_sidebar()
+    return sidebar["tags"], sidebar["users"]
 
 
-def paginate(objects_list, list_num, request):
-    paginator = Paginator(objects_list, list_num)
+def paginate(objects_list, list_num, request, count=None):
+    if count is None:
+        paginator = Paginator(objects_list, list_num)
+    else:
+        paginator = CountedPaginator(objects_list, list_num, count)
     page = request.GET.get("page")
 
     contacts = paginator.get_page(page)
@@ -20,11 +33,28 @@ def paginate(objects_list, list_num, request):
     return contacts
 
 
+def seek_paginate(objects_list, list_num, request, keys, count_key=None):
+    paginator = KeysetPaginator(objects_list, list_num, keys, count_key)
+
+    return paginator.get_page(
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        last="last" in request.GET,
+    )
+
+
+@cache_for_anonymous("index", lambda: ["index"])
 def index(request):
     if request.method == "POST":
         logout(request)
 
-    q = paginate(Question.objects.get_question_by_date(), 10, request)
+    q = seek_paginate(
+        Question.objects.get_question_by_date(),
+        10,
+        request,
+        ("-create_date", "-id"),
+        "index",
+    )
     tags, users = get_tags_and_users()
     return render(
         request,
@@ -33,22 +63,21 @@ def index(request):
     )
 
 
+@cache_for_anonymous("question", lambda id: ["question:%s" % id])
 def question(request, id):
     try:
-        q = Question.objects.get_question_by_id(id)
         if request.method == "POST":
             if not request.user.is_authenticated:
                 return redirect("/login/")
+            q = Question.objects.get(id=id)
             form = AddAnswerForm(
                 request.POST, initial={"user": request.user, "question": q}
             )
             if form.is_valid():
-                form.save()
-                answers = paginate(
-                    Answer.objects.get_answers_by_id(q.id), 4, request
-                )
-                return redirect(Answer.objects.get_absolute_url(q, answers))
+                answer = form.save()
+                return redirect(Answer.objects.get_absolute_url(answer))
         else:
+            q = Question.objects.get_question_by_id(id)
             form = AddAnswerForm()
     except Question.DoesNotExist:
         return render(
@@ -56,7 +85,14 @@ def question(request, id):
             "404.html",
         )
 
-    answers = paginate(Answer.objects.get_answers_by_id(q.id), 4, request)
+    # Answer links (Answer.objects.get_absolute_url) point at page numbers,
+    # so the answers keep numbered pages, counted by the stored counter.
+    answers = paginate(
+        Answer.objects.get_answers_by_id(q.id),
+        ANSWERS_PER_PAGE,
+        request,
+        q.answers_count,
+    )
     tags, users = get_tags_and_users()
     return render(
         request,
@@ -71,10 +107,20 @@ def question(request, id):
     )
 
 
+@cache_for_anonymous("tag", lambda tagname: ["tag:%s" % tagname])
 def tag(request, tagname):
+    if Tag.objects.normalize(tagname) != tagname:
+        return redirect("tag", tagname=Tag.objects.normalize(tagname))
     try:
-        questions = paginate(
-            Question.objects.get_questions_by_tag(tagname), 10, request
+        questions = seek_paginate(
+            TaggedQuestion.objects.get_by_tag(tagname),
+            10,
+            request,
+            ("-create_date", "-question_id"),
+            "tag:%s" % tagname,
+        )
+        questions.object_list = Question.objects.get_questions_in_order(
+            [row.question_id for row in questions.object_list]
         )
     except:
         return render(
@@ -89,8 +135,15 @@ def tag(request, tagname):
     )
 
 
+@cache_for_anonymous("hot", lambda: ["hot"])
 def hot(request):
-    q = paginate(Question.objects.get_question_by_popular(), 10, request)
+    q = seek_paginate(
+        Question.objects.get_question_by_popular(),
+        10,
+        request,
+        ("-hot_score", "-id"),
+        "hot",
+    )
     tags, users = get_tags_and_users()
     return render(
         request,
@@ -99,6 +152,25 @@ def hot(request):
     )
 
 
+def search(request):
+    query = request.GET.get("q", "").strip()
+    results = paginate(Question.objects.search(query) if query else [], 10, request)
+    results.object_list = Question.objects.get_questions_in_order(results.object_list)
+    tags, users = get_tags_and_users()
+    return render(
+        request,
+        "questions/search.html",
+        {
+            "paginate": results,
+            "query": query,
+            "page_query": urlencode({"q": query}) + "&",
+            "tags": tags,
+            "users": users,
+        },
+    )
+
+
+@rate_limited("signIn")
 def sign_in(request):
     if request.method == "POST":
         form = AuthForm(request.POST, initial={"request": request})
@@ -112,6 +184,7 @@ def sign_in(request):
     return render(request, "questions/auth.html", {"form": form})
 
 
+@rate_limited("signUp")
 def sign_up(request):
     if request.method == "POST":
         form = SignUpFrom(request.POST, request.FILES)
@@ -169,21 +242,62 @@ def ask(request):
     return render(request, "questions/question_form.html", {"form": form})
 
 
-@login_required(login_url="/login")
-def like_question(request):
+def vote(manager, request, id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if request.POST.get("value") not in ("like", "dislike"):
+        return JsonResponse({"error": "Unknown vote"}, status=400)
+    if not manager.filter(id=id).exists():
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    counters = manager.vote(id, request.user, request.POST["value"] == "like")
+    return JsonResponse(
+        {
+            "likes": counters["likes_count"],
+            "dislikes": counters["dislikes_count"],
+            "rating": counters["rating"],
+        }
+    )
+
+
+@require_POST
+def vote_question(request, id):
+    return vote(Question.objects, request, id)
+
+
+@require_POST
+def vote_answer(request, id):
+    return vote(Answer.objects, request, id)
+
+
+@staff_member_required
+def metrics(request):
+    lines = [registry.export()]
+    for view, stats in page_cache_stats().items():
+        for event, n in stats.items():
+            lines.append(
+                'questions_page_cache_total{view="%s",event="%s"} %i\n'
+                % (view, event, n)
+            )
+    return HttpResponse("".join(lines), content_type="text/plain; version=0.0.4")
+
+
+@require_POST
+def accept_answer(request, id):
+    if not request.user.is_authenticated:
+        return redirect("/login/")
     try:
-        q = Question.objects.get_question_by_id(id)
-        if request.method == "POST":
-            form = AddQuestionForm(request.POST, initial={"user": request.user})
-            if form.is_valid():
-                q = form.save()
-                return redirect(Question.objects.get_absolute_url(q.id))
+        answer = Answer.objects.accept(id, request.user)
+    except Answer.DoesNotExist:
+        return render(request, "404.html")
+    except PermissionDenied:
+        return HttpResponse("Only the question's author can do that", status=403)
 
-        else:
-            form = AddQuestionForm()
+    return redirect(Answer.objects.get_absolute_url(answer))
 
-    except Question.DoesNotExist:
-        return render(
-            request,
-            "404.html",
-        )
+
+def answer(request, id):
+    try:
+        return redirect(Answer.objects.locate(id))
+    except Answer.DoesNotExist:
+        return render(request, "404.html")